@@ -1,10 +1,70 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Tuple, Type, Union
+import functools
 import logging
 import asyncio
 
+from pydantic import BaseModel, ValidationError
+
+try:
+    import jsonschema
+except ImportError:  # 未安装 jsonschema 时不校验字典形式的 schema
+    jsonschema = None
+
 logger = logging.getLogger(__name__)
 
+# 结构化输出的 schema：JSON Schema 字典，或描述输出结构的 pydantic 模型类
+SchemaType = Union[Dict[str, Any], Type[BaseModel]]
+
+# 结构化输出不符合 schema 时抛出的异常类型（pydantic 模型校验，及 jsonschema 字典 schema 校验）
+SCHEMA_VALIDATION_ERRORS: Tuple[Type[Exception], ...] = (ValidationError,) + (
+    (jsonschema.ValidationError,) if jsonschema is not None else ()
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _model_json_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """生成 pydantic 模型的 JSON Schema（每个模型类只生成一次，调用方不应修改返回值）"""
+    return model.model_json_schema()
+
+
+def resolve_schema(schema: SchemaType) -> Tuple[Dict[str, Any], Optional[Type[BaseModel]]]:
+    """
+    将 schema 参数统一为 JSON Schema 字典。
+
+    Returns:
+        (JSON Schema 字典, pydantic 模型类)；传入字典时模型类为 None。
+
+    Raises:
+        ValueError: 如果 schema 既不是字典也不是 pydantic 模型类。
+    """
+    if isinstance(schema, dict):
+        return schema, None
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        return _model_json_schema(schema), schema
+    raise ValueError("Schema must be a dictionary or a pydantic model class.")
+
+
+def validate_structured_output(
+    data: Any, schema_dict: Dict[str, Any], schema_model: Optional[Type[BaseModel]]
+) -> Any:
+    """
+    按 resolve_schema 的结果校验解析后的结构化输出。
+
+    Returns:
+        传入 pydantic 模型类时返回校验后的模型实例；否则返回 data 本身
+        (安装了 jsonschema 时先按字典 schema 校验)。
+
+    Raises:
+        SCHEMA_VALIDATION_ERRORS 中的异常: 如果输出不符合 schema。
+    """
+    if schema_model is not None:
+        return schema_model.model_validate(data)
+    if jsonschema is not None:
+        jsonschema.validate(data, schema_dict)
+    return data
+
+
 class LLMInterface(ABC):
     """大语言模型调用的抽象基类接口"""
 
@@ -49,7 +109,7 @@ class LLMInterface(ABC):
     async def generate_structured_content_async(
         self,
         prompt: str,
-        schema: Dict[str, Any],
+        schema: SchemaType,
         temperature: float = 0.1,
         **kwargs: Any
     ) -> Any:
@@ -58,12 +118,12 @@ class LLMInterface(ABC):
 
         Args:
             prompt: 输入的提示词。
-            schema: 期望输出的 JSON Schema 定义。
+            schema: 期望输出的 JSON Schema 定义，或描述输出结构的 pydantic 模型类。
             temperature: 控制生成的随机性 (通常较低以保证结构)。
             **kwargs: 其他特定于模型的参数。
 
         Returns:
-            解析后的结构化数据 (例如，列表或字典)。
+            解析后的结构化数据 (例如，列表或字典)；schema 为 pydantic 模型类时返回校验后的模型实例。
 
         Raises:
             Exception: 如果无法生成或解析。
@@ -126,6 +186,29 @@ class LLMInterface(ABC):
         """
         pass
 
+    async def warm_up(self) -> None:
+        """
+        预热与 LLM 服务的连接 (异步)，让首次真实调用不必承担 DNS 解析和 TLS 握手的耗时。
+
+        可以在服务启动后与其他初始化工作并发调用；失败不影响后续调用。
+        默认实现不做任何事，持有连接池的子类应覆盖此方法。
+        """
+        pass
+
+    async def aclose(self) -> None:
+        """
+        释放底层 HTTP 连接池等资源 (异步)。
+
+        默认实现不做任何事，持有连接池的子类应覆盖此方法。
+        """
+        pass
+
+    async def __aenter__(self) -> "LLMInterface":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
     # --- Synchronous Wrappers (Optional, use with caution) ---
 
     def _run_async_task(self, coro):
@@ -165,7 +248,7 @@ class LLMInterface(ABC):
     def generate_structured_content(
         self,
         prompt: str,
-        schema: Dict[str, Any],
+        schema: SchemaType,
         temperature: float = 0.1,
         **kwargs: Any
     ) -> Any:
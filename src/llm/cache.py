@@ -0,0 +1,116 @@
+"""
+LLM 响应缓存
+
+按提供商、模型、提示词、schema、温度及其他调用参数计算内容哈希，
+将结构化输出缓存到磁盘，重复的请求直接返回缓存结果而不再调用 API。
+
+设置 LLM_CACHE_DIR 环境变量后启用（默认不缓存），且只缓存低温度的调用。
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时使用标准库 json
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# 只缓存温度不高于该值的调用（接近确定性输出，缓存结果才有意义）
+CACHEABLE_MAX_TEMPERATURE = 0.1
+
+
+class ResponseCache:
+    """基于内容哈希的磁盘响应缓存，每个条目保存为一个 JSON 文件"""
+
+    def __init__(self, cache_dir: str):
+        """
+        Args:
+            cache_dir: 缓存文件目录，不存在时自动创建
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        model: str,
+        prompt: str,
+        schema: Dict[str, Any],
+        temperature: float,
+        extra: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """计算请求的缓存键（每个字段带长度前缀后做 SHA-256，避免拼接产生歧义）"""
+        parts = (
+            provider,
+            model,
+            prompt,
+            json.dumps(schema, sort_keys=True, ensure_ascii=False),
+            repr(float(temperature)),
+            json.dumps(extra or {}, sort_keys=True, ensure_ascii=False, default=str),
+        )
+        digest = hashlib.sha256()
+        for part in parts:
+            data = part.encode('utf-8')
+            digest.update(len(data).to_bytes(8, 'little'))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存条目，未命中或条目损坏时返回 None
+
+        Returns:
+            包含 response、model、created_at_utc 的字典
+        """
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+            entry = orjson.loads(data) if orjson is not None else json.loads(data)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取 LLM 响应缓存失败 ({key}): {e}")
+            return None
+        return entry if isinstance(entry, dict) and 'response' in entry else None
+
+    def put(self, key: str, response: Any, model: str) -> None:
+        """写入缓存条目（先写临时文件再原子替换，写入失败只记录警告）"""
+        entry = {
+            'response': response,
+            'model': model,
+            'created_at_utc': datetime.now(timezone.utc).isoformat(),
+        }
+        path = self._path(key)
+        tmp_path = path + '.tmp'
+        try:
+            if orjson is not None:
+                content = orjson.dumps(entry)
+            else:
+                content = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"写入 LLM 响应缓存失败 ({key}): {e}")
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """根据 LLM_CACHE_DIR 环境变量创建响应缓存，未设置或目录不可用时返回 None"""
+    cache_dir = os.environ.get("LLM_CACHE_DIR")
+    if not cache_dir:
+        return None
+    try:
+        cache = ResponseCache(os.path.expanduser(cache_dir))
+    except OSError as e:
+        logger.warning(f"无法创建 LLM 响应缓存目录 {cache_dir}: {e}")
+        return None
+    logger.info(f"LLM 响应缓存已启用: {cache.cache_dir}")
+    return cache
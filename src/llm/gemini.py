@@ -8,7 +8,16 @@ import google.generativeai as genai
 from google.generativeai.types import GenerationConfig, ContentDict, PartDict
 from google.api_core.exceptions import GoogleAPIError  # More specific error handling
 
-from .base import LLMInterface
+from .base import LLMInterface, SchemaType, resolve_schema
+from .cache import CACHEABLE_MAX_TEMPERATURE, ResponseCache, get_response_cache
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard json module when orjson is not installed
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers keep catching the latter
+_json_loads = orjson.loads if orjson is not None else json.loads
 
 logger = logging.getLogger(__name__)
 
@@ -57,6 +66,9 @@ class GeminiLLM(LLMInterface):
             logger.error(f"Failed to initialize Gemini model '{self.model_name}': {e}", exc_info=True)
             raise RuntimeError(f"Failed to initialize Gemini model '{self.model_name}': {e}") from e
 
+        # Optional on-disk cache for low-temperature structured responses (LLM_CACHE_DIR)
+        self._response_cache = get_response_cache()
+
     async def generate_text_async(
         self,
         prompt: str,
@@ -79,7 +91,7 @@ class GeminiLLM(LLMInterface):
         Raises:
             Exception: If the API call fails or response is invalid.
         """
-        logger.debug(f"Generating text with Gemini (model: {self.model_name}, temp: {temperature}, max_tokens: {max_tokens})")
+        logger.debug("Generating text with Gemini (model: %s, temp: %s, max_tokens: %s)", self.model_name, temperature, max_tokens)
 
         generation_config = GenerationConfig(
             temperature=temperature,
@@ -115,7 +127,7 @@ class GeminiLLM(LLMInterface):
     async def generate_structured_content_async(
         self,
         prompt: str,
-        schema: Dict[str, Any],
+        schema: SchemaType,
         temperature: float = 0.1, # Lower temp for structured output
         **kwargs: Any
     ) -> Any:
@@ -124,27 +136,36 @@ class GeminiLLM(LLMInterface):
 
         Args:
             prompt: The input prompt.
-            schema: The desired JSON schema definition.
+            schema: The desired JSON schema definition, or a pydantic model class.
             temperature: Controls randomness (usually low for structure).
             **kwargs: Additional parameters for GenerationConfig.
 
         Returns:
-            The parsed structured data (e.g., list or dict).
+            The parsed structured data (e.g., list or dict), or a validated model
+            instance when schema is a pydantic model class.
 
         Raises:
             ValueError: If the schema is invalid.
             Exception: If API call fails or response cannot be parsed.
         """
-        logger.debug(f"Generating structured content with Gemini (model: {self.model_name}, temp: {temperature})")
+        logger.debug("Generating structured content with Gemini (model: %s, temp: %s)", self.model_name, temperature)
+
+        schema_dict, schema_model = resolve_schema(schema)
 
-        if not isinstance(schema, dict):
-             raise ValueError("Schema must be a dictionary.")
+        cache_key = None
+        if self._response_cache is not None and temperature <= CACHEABLE_MAX_TEMPERATURE:
+            cache_key = ResponseCache.make_key("gemini", self.model_name, prompt, schema_dict, temperature, kwargs)
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                logger.debug("Returning cached structured response (key: %s)", cache_key)
+                cached_data = cached["response"]
+                return schema_model.model_validate(cached_data) if schema_model else cached_data
 
         # The SDK handles schema validation internally when passed to GenerationConfig
         generation_config = GenerationConfig(
             temperature=temperature,
             response_mime_type="application/json",
-            response_schema=schema, # Pass the schema directly
+            response_schema=schema, # Pass the schema (dict or pydantic model class) directly
             **kwargs
         )
 
@@ -164,12 +185,15 @@ class GeminiLLM(LLMInterface):
 
 
             json_string = response.text
-            logger.debug(f"Received raw JSON string: {json_string[:200]}...") # Log snippet
+            if logger.isEnabledFor(logging.DEBUG):  # Skip the snippet slice when DEBUG is off
+                logger.debug("Received raw JSON string: %s...", json_string[:200])
 
             # Parse the JSON string returned by the SDK
-            parsed_data = json.loads(json_string)
+            parsed_data = _json_loads(json_string)
             logger.debug("Successfully parsed JSON response from Gemini.")
-            return parsed_data
+            if cache_key is not None:
+                self._response_cache.put(cache_key, parsed_data, self.model_name)
+            return schema_model.model_validate(parsed_data) if schema_model else parsed_data
 
         except json.JSONDecodeError as e:
             logger.error(f"Failed to decode JSON response from Gemini: {e}. Response text: {json_string}", exc_info=True)
@@ -2,15 +2,58 @@ import os
 import json
 import logging
 import re
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 
 import openai
 from openai import OpenAI, AsyncOpenAI
-
-from .base import LLMInterface
+from .base import (
+    SCHEMA_VALIDATION_ERRORS,
+    LLMInterface,
+    SchemaType,
+    resolve_schema,
+    validate_structured_output,
+)
+from .cache import CACHEABLE_MAX_TEMPERATURE, ResponseCache, get_response_cache
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard json module when orjson is not installed
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers keep catching the latter
+_json_loads = orjson.loads if orjson is not None else json.loads
 
 logger = logging.getLogger(__name__)
 
+# Key under which non-object schemas are wrapped, since json_schema response formats need an object root
+_WRAPPED_KEY = "items"
+
+
+def _json_schema_response_format(schema_dict: Dict[str, Any], name: str) -> Tuple[Dict[str, Any], bool]:
+    """
+    Builds a json_schema response_format from a resolved JSON schema.
+
+    The API only accepts an object at the schema root, so any other schema (such as the
+    task arrays used for PRD parsing) is wrapped in {"items": ...}.
+
+    Returns:
+        (response_format, whether the reply has to be unwrapped).
+    """
+    wrapped = schema_dict.get("type") != "object"
+    if wrapped:
+        schema_dict = {
+            "type": "object",
+            "properties": {_WRAPPED_KEY: schema_dict},
+            "required": [_WRAPPED_KEY],
+        }
+    response_format = {
+        "type": "json_schema",
+        # strict mode would require every property to be listed as required
+        "json_schema": {"name": name, "schema": schema_dict, "strict": False},
+    }
+    return response_format, wrapped
+
+
 class OpenAILLM(LLMInterface):
     """OpenAI LLM implementation using the openai SDK."""
 
@@ -40,9 +83,11 @@ class OpenAILLM(LLMInterface):
             raise ValueError("OpenAI API Key is required.")
 
         try:
-            # Create both sync and async clients for flexibility
-            self.client = OpenAI(api_key=self.api_key)
+            # One async client is shared by every call so its keep-alive connection
+            # pool is reused; the sync client is only built if something asks for it.
+            self._client: Optional[OpenAI] = None
             self.async_client = AsyncOpenAI(api_key=self.api_key)
+            self._warmed = False
             logger.info("OpenAI SDK configured successfully.")
         except Exception as e:
             logger.error(f"Failed to configure OpenAI SDK: {e}", exc_info=True)
@@ -53,6 +98,42 @@ class OpenAILLM(LLMInterface):
         self.model_name = self.config.get("model_name", model_name)
         logger.info(f"Initialized OpenAI model: {self.model_name}")
 
+        # Optional on-disk cache for low-temperature structured responses (LLM_CACHE_DIR)
+        self._response_cache = get_response_cache()
+        # json_object mode guarantees neither parseable output nor schema conformance;
+        # re-prompt this many times in total
+        self.structured_max_attempts = max(1, int(self.config.get("structured_max_attempts", 3)))
+
+    @property
+    def client(self) -> OpenAI:
+        """Synchronous OpenAI client, created on first access."""
+        if self._client is None:
+            self._client = OpenAI(api_key=self.api_key)
+        return self._client
+
+    async def warm_up(self) -> None:
+        """
+        Opens a pooled keep-alive connection to the API with a cheap model-list request.
+
+        Runs at most once per instance; errors are logged and ignored because the
+        real call will surface any genuine connectivity problem.
+        """
+        if self._warmed:
+            return
+        self._warmed = True
+        try:
+            await self.async_client.models.list()
+            logger.debug("OpenAI connection warmed up.")
+        except Exception as e:
+            logger.debug("OpenAI warm-up request failed (ignored): %s", e)
+
+    async def aclose(self) -> None:
+        """Closes the pooled HTTP connections held by the OpenAI clients."""
+        await self.async_client.close()
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
     async def generate_text_async(
         self,
         prompt: str,
@@ -75,7 +156,7 @@ class OpenAILLM(LLMInterface):
         Raises:
             Exception: If the API call fails or response is invalid.
         """
-        logger.debug(f"Generating text with OpenAI (model: {self.model_name}, temp: {temperature}, max_tokens: {max_tokens})")
+        logger.debug("Generating text with OpenAI (model: %s, temp: %s, max_tokens: %s)", self.model_name, temperature, max_tokens)
 
         try:
             response = await self.async_client.chat.completions.create(
@@ -110,7 +191,7 @@ class OpenAILLM(LLMInterface):
     async def generate_structured_content_async(
         self,
         prompt: str,
-        schema: Dict[str, Any],
+        schema: SchemaType,
         temperature: float = 0.1, # Lower temp for structured output
         **kwargs: Any
     ) -> Any:
@@ -119,49 +200,90 @@ class OpenAILLM(LLMInterface):
 
         Args:
             prompt: The input prompt.
-            schema: The desired JSON schema definition.
+            schema: The desired JSON schema definition, or a pydantic model class.
             temperature: Controls randomness (usually low for structure).
             **kwargs: Additional parameters for API call.
 
         Returns:
-            The parsed structured data (e.g., list or dict).
+            The parsed structured data (e.g., list or dict), or a validated model
+            instance when schema is a pydantic model class.
 
         Raises:
             ValueError: If the schema is invalid.
             Exception: If API call fails or response cannot be parsed.
         """
-        logger.debug(f"Generating structured content with OpenAI (model: {self.model_name}, temp: {temperature})")
-
-        if not isinstance(schema, dict):
-             raise ValueError("Schema must be a dictionary.")
+        logger.debug("Generating structured content with OpenAI (model: %s, temp: %s)", self.model_name, temperature)
+
+        schema_dict, schema_model = resolve_schema(schema)
+        response_format, wrapped = _json_schema_response_format(
+            schema_dict, schema_model.__name__ if schema_model else "structured_response"
+        )
+
+        cache_key = None
+        if self._response_cache is not None and temperature <= CACHEABLE_MAX_TEMPERATURE:
+            cache_key = ResponseCache.make_key("openai", self.model_name, prompt, schema_dict, temperature, kwargs)
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                logger.debug("Returning cached structured response (key: %s)", cache_key)
+                cached_data = cached["response"]
+                return schema_model.model_validate(cached_data) if schema_model else cached_data
+
+        messages = [
+            {"role": "user", "content": prompt}
+        ]
 
         try:
-            # Use the OpenAI Chat API with function calling capabilities
-            response = await self.async_client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=temperature,
-                response_format={"type": "json_object"},  # Ensure JSON response
-                **kwargs
-            )
-
-            if not response.choices or len(response.choices) == 0:
-                logger.warning(f"OpenAI structured response for prompt '{prompt[:50]}...' contained no choices.")
-                raise Exception("OpenAI returned an empty response for structured content.")
-
-            json_string = response.choices[0].message.content
-            logger.debug(f"Received raw JSON string: {json_string[:200]}...") # Log snippet
+            for attempt in range(1, self.structured_max_attempts + 1):
+                # Use the OpenAI Chat API with function calling capabilities
+                response = await self.async_client.chat.completions.create(
+                    model=self.model_name,
+                    messages=messages,
+                    temperature=temperature,
+                    response_format=response_format,  # Constrain the reply to the schema
+                    **kwargs
+                )
+
+                if not response.choices or len(response.choices) == 0:
+                    logger.warning(f"OpenAI structured response for prompt '{prompt[:50]}...' contained no choices.")
+                    raise Exception("OpenAI returned an empty response for structured content.")
+
+                json_string = response.choices[0].message.content
+                if logger.isEnabledFor(logging.DEBUG):  # Skip the snippet slice when DEBUG is off
+                    logger.debug("Received raw JSON string: %s...", json_string[:200])
+
+                # Parse the JSON string returned by the API and validate it against the
+                # schema (dict or pydantic model); on failure, show the model its own output
+                # together with the parser or validation error and ask for a corrected reply
+                try:
+                    parsed_data = _json_loads(json_string)
+                    if wrapped and isinstance(parsed_data, dict) and _WRAPPED_KEY in parsed_data:
+                        parsed_data = parsed_data[_WRAPPED_KEY]
+                    result = validate_structured_output(parsed_data, schema_dict, schema_model)
+                    break
+                except (json.JSONDecodeError, *SCHEMA_VALIDATION_ERRORS) as e:
+                    if attempt == self.structured_max_attempts:
+                        raise
+                    if isinstance(e, SCHEMA_VALIDATION_ERRORS):
+                        problem = "did not match the required schema"
+                    else:
+                        problem = "was not valid JSON"
+                    logger.warning("OpenAI reply %s (attempt %d/%d): %s. Retrying with feedback.", problem, attempt, self.structured_max_attempts, e)
+                    messages = messages + [
+                        {"role": "assistant", "content": json_string},
+                        {"role": "user", "content": f"Your previous reply {problem}:\n{e}\nReply again with only the corrected JSON and no other text."},
+                    ]
 
-            # Parse the JSON string returned by the API
-            parsed_data = json.loads(json_string)
             logger.debug("Successfully parsed JSON response from OpenAI.")
-            return parsed_data
+            if cache_key is not None:
+                self._response_cache.put(cache_key, parsed_data, self.model_name)
+            return result
 
         except json.JSONDecodeError as e:
             logger.error(f"Failed to decode JSON response from OpenAI: {e}. Response text: {json_string if 'json_string' in locals() else 'N/A'}", exc_info=True)
             raise Exception(f"Failed to parse LLM JSON response: {e}") from e
+        except SCHEMA_VALIDATION_ERRORS as e:
+            logger.error("OpenAI response does not match the schema: %s. Response text: %s", e, json_string, exc_info=True)
+            raise Exception(f"LLM JSON response does not match the schema: {e}") from e
         except openai.OpenAIError as e:
             logger.error(f"OpenAI API error during structured generation: {e}", exc_info=True)
             raise Exception(f"OpenAI API error: {e}") from e
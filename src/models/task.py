@@ -7,7 +7,7 @@
 from enum import Enum
 from typing import Dict, List, Optional, Set, Union, Any
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class TaskStatus(str, Enum):
@@ -34,6 +34,10 @@ class TaskComplexity(str, Enum):
     HIGH = "high"
 
 
+# 优先级排序权重（数值越小越优先，未知优先级排在最后）
+_PRIO_RANK = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+
+
 class Task(BaseModel):
     """任务数据模型"""
     
@@ -66,9 +70,26 @@ class Task(BaseModel):
     parent_task_id: Optional[str] = Field(None, description="父任务ID")
     subtasks: List['Task'] = Field(default_factory=list, description="子任务列表")
     
+    # 排序用的缓存字段，不参与序列化
+    _prio_rank: int = PrivateAttr(default=4)
+    _status_rank: int = PrivateAttr(default=1)
+    # 是否为主任务（ID 中不含 "."），创建时计算一次
+    _is_main_task: bool = PrivateAttr(default=True)
+    
     class Config:
         use_enum_values = True
 
+    def model_post_init(self, __context: Any) -> None:
+        """创建后计算排序缓存字段"""
+        self._is_main_task = "." not in self.id
+        self.refresh_ranks()
+
+    def refresh_ranks(self) -> None:
+        """根据当前优先级和状态刷新排序缓存字段（修改 priority/status 后调用）"""
+        self._prio_rank = _PRIO_RANK.get(self.priority, 4)
+        # 状态优先级：in_progress优先于其他状态
+        self._status_rank = 0 if self.status == TaskStatus.IN_PROGRESS else 1
+
     def add_dependency(self, task_id: str) -> None:
         """添加依赖任务"""
         self.dependencies.add(task_id)
@@ -95,22 +116,25 @@ class Task(BaseModel):
         """将任务标记为进行中"""
         self.status = TaskStatus.IN_PROGRESS
         self.updated_at = datetime.now()
+        self.refresh_ranks()
     
     def mark_as_done(self) -> None:
         """将任务标记为已完成"""
         self.status = TaskStatus.DONE
-        self.updated_at = datetime.now()
-        self.completed_at = datetime.now()
+        self.updated_at = self.completed_at = datetime.now()
+        self.refresh_ranks()
     
     def mark_as_blocked(self) -> None:
         """将任务标记为已阻塞"""
         self.status = TaskStatus.BLOCKED
         self.updated_at = datetime.now()
+        self.refresh_ranks()
     
     def mark_as_cancelled(self) -> None:
         """将任务标记为已取消"""
         self.status = TaskStatus.CANCELLED
         self.updated_at = datetime.now()
+        self.refresh_ranks()
 
 
 class TaskListResponse(BaseModel):
@@ -4,10 +4,12 @@
 提供与MCP协议兼容的任务管理服务接口
 """
 
+import asyncio
 import logging
 import os
 import sys
 import json
+from contextlib import asynccontextmanager
 from mcp.server.fastmcp import FastMCP
 import mcp.types as types
 
@@ -21,7 +23,7 @@ from config import get_llm_client
 # 导入新的工具函数
 from utils.logging_config import setup_logging
 from utils.file_operations import save_task_to_json, save_tasks_to_json, clear_directory
-from utils.task_utils import generate_next_task_id, format_task_table
+from utils.task_utils import format_task_table
 from src.models.task import Task
 
 # 全局变量，用于保存项目的PRD内容
@@ -52,13 +54,23 @@ logger = setup_logging(log_file_path, logging.INFO)
 logger.info("Initializing LLM client based on environment configuration...")
 llm_client = get_llm_client() # Returns LLMInterface instance or None
 
+@asynccontextmanager
+async def server_lifespan(server: FastMCP):
+    """服务运行期间的初始化与清理：启动后在后台预热 LLM 连接，不阻塞服务就绪"""
+    warm_up_task = asyncio.create_task(llm_client.warm_up()) if llm_client else None
+    try:
+        yield {}
+    finally:
+        if warm_up_task is not None and not warm_up_task.done():
+            warm_up_task.cancel()
+
 # 创建MCP实例 - 使用标准变量名 'mcp' 而不是 'mcp_app'
-mcp = FastMCP("task-manager-mcp")
+mcp = FastMCP("task-manager-mcp", lifespan=server_lifespan)
 
 # ----> 创建任务服务实例，并注入 LLM 客户端和任务存储目录 <----
 logger.info("Initializing TaskService...")
 # 创建TaskStorage实例，使用TASKS_DIR作为存储目录
-from storage.task_storage import TaskStorage
+from storage.task_storage import TaskStorage, read_task_file
 task_storage = TaskStorage(tasks_dir=TASKS_DIR)
 task_service = TaskService(storage=task_storage, llm_client=llm_client)
 logger.info(f"TaskService initialized successfully.")
@@ -94,21 +106,18 @@ async def decompose_prd(prd_content: str) -> list[types.TextContent]:
         clear_directory(MD_DIR)
         logger.info("所有任务相关文件已清空")
         
-        # 验证清空操作是否成功
-        all_tasks_file = os.path.join(TASKS_DIR, "all_tasks.json")
+        # 验证清空操作是否成功（主任务文件可能是 JSON 或 msgpack 格式）
+        all_tasks_file = task_storage.master_file_path
         if os.path.exists(all_tasks_file):
-            # 检查文件是否为空数组
+            # 检查文件中的任务列表是否为空
             try:
-                with open(all_tasks_file, 'r', encoding='utf-8') as f:
-                    content = json.load(f)
-                    if content and len(content) > 0:
-                        logger.warning(f"任务文件清空后仍包含 {len(content)} 个任务，尝试重新创建空文件")
-                        with open(all_tasks_file, 'w', encoding='utf-8') as f:
-                            json.dump([], f)
+                saved_tasks = read_task_file(all_tasks_file)
+                if saved_tasks:
+                    logger.warning(f"任务文件清空后仍包含 {len(saved_tasks)} 个任务，尝试重新创建空文件")
+                    task_service.clear_all_tasks()
             except Exception as e:
                 logger.warning(f"检查任务文件时出错: {e}，将重新创建空文件")
-                with open(all_tasks_file, 'w', encoding='utf-8') as f:
-                    json.dump([], f)
+                task_service.clear_all_tasks()
     except Exception as clear_e:
         logger.error(f"清空任务或文件失败: {clear_e}")
         # 即使清空失败，也继续尝试解析，但要记录错误
@@ -325,7 +334,7 @@ async def add_task(
     task_dependencies = [dep.strip() for dep in dependencies.split(",")] if dependencies else []
     
     # 如果没有提供ID，则生成一个顺延的ID
-    task_id = id.strip() if id.strip() else generate_next_task_id()
+    task_id = id.strip() if id.strip() else task_service.storage.next_task_id()
     logger.info(f"使用任务ID: {task_id}")
     
     try:
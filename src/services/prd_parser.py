@@ -106,6 +106,8 @@ class PrdParser:
         headers = re.findall(r'#\s+(.*)|##\s+(.*)', prd_content)
         
         tasks_map = {} # Map generated ID to {task: Task, level: int}
+        task_specs = [] # create_task arguments for each header, created in one batch below
+        task_levels = [] # Header level of each entry in task_specs
         h1_counter = 0
         h2_counter = 0
         current_h1_id = "0" # Keep track of the current H1 ID for H2 subtasks
@@ -132,23 +134,26 @@ class PrdParser:
                 continue
                 
             logger.debug(f"[PrdParser Fallback] Creating task with ID: {task_id}, Title: {title.strip()}")
-            try:
-                # --> Pass the generated ID to create_task <--
-                task = self.storage.create_task(
-                                id=task_id, # Pass the generated ID here
-                    name=title.strip(),
-                                description=f"从PRD自动提取的任务 (Fallback): {title}",
-                    priority=TaskPriority.MEDIUM if level == 1 else TaskPriority.LOW
-                )
-                tasks.append(task)
-                tasks_map[task_id] = {"task": task, "level": level}
-            except Exception as create_exc:
-                # Log error if task creation with specific ID fails
-                logger.error(f"[PrdParser Fallback] Failed to create task with ID {task_id} for title '{title.strip()}': {create_exc}", exc_info=True)
-                # Skip this task for dependency setting etc.
+            task_specs.append({
+                "id": task_id, # Pass the generated ID here
+                "name": title.strip(),
+                "description": f"从PRD自动提取的任务 (Fallback): {title}",
+                "priority": TaskPriority.MEDIUM if level == 1 else TaskPriority.LOW
+            })
+            task_levels.append(level)
+        
+        # Create all tasks in one batch (a single file write); failed specs come back as None
+        for spec, level, task in zip(task_specs, task_levels, self.storage.bulk_create(task_specs)):
+            if task is None:
+                # Skip this task for dependency setting etc. (the storage error is already logged)
+                logger.error(f"[PrdParser Fallback] Failed to create task with ID {spec['id']} for title '{spec['name']}'")
                 continue
+            tasks.append(task)
+            tasks_map[task.id] = {"task": task, "level": level}
         
         # --- Dependency setting logic (uses the generated IDs stored in tasks_map) ---
+        # Collect all edges first and write them as one batch (single cycle check)
+        dependency_edges: List[Tuple[str, str]] = []
         current_parent_task_id = None
         for i, task in enumerate(tasks):
             if task.id not in tasks_map:
@@ -161,13 +166,8 @@ class PrdParser:
             if current_level == 1:
                 current_parent_task_id = task.id # Store the ID of the H1 task
             elif current_level == 2 and current_parent_task_id:
-                try: 
-                    logger.debug(f"[PrdParser Fallback] Setting parent dependency: {task.id} -> {current_parent_task_id}")
-                    success, _ = self.storage.set_task_dependency(task.id, current_parent_task_id)
-                    if not success:
-                         logger.warning(f"[PrdParser Fallback] Failed setting parent dependency for task {task.id} -> {current_parent_task_id}")
-                except Exception as dep_exc:
-                     logger.error(f"[PrdParser Fallback] Error setting parent dependency for task {task.id} -> {current_parent_task_id}: {dep_exc}", exc_info=True)
+                logger.debug(f"[PrdParser Fallback] Adding parent dependency: {task.id} -> {current_parent_task_id}")
+                dependency_edges.append((task.id, current_parent_task_id))
 
             # Set sequential dependency (task depends on previous task of the same level)
             if i > 0:
@@ -180,21 +180,50 @@ class PrdParser:
                           
                 if prev_task_index != -1:
                      prev_task = tasks[prev_task_index]
-                     try:
-                         logger.debug(f"[PrdParser Fallback] Setting sequential dependency: {task.id} -> {prev_task.id}")
-                         success, msg = self.storage.set_task_dependency(task.id, prev_task.id)
-                         if not success:
-                            logger.warning(f"[PrdParser Fallback] Failed setting sequential dependency for task {task.id} -> {prev_task.id}: {msg}") 
-                     except Exception as seq_dep_exc:
-                         logger.error(f"[PrdParser Fallback] Error setting sequential dependency for task {task.id} -> {prev_task.id}: {seq_dep_exc}", exc_info=True)
+                     logger.debug(f"[PrdParser Fallback] Adding sequential dependency: {task.id} -> {prev_task.id}")
+                     dependency_edges.append((task.id, prev_task.id))
                 # else: # No previous task of the same level found (e.g., first H2 under an H1)
                 #     logger.debug(f"[PrdParser Fallback] No preceding task of level {current_level} found for sequential dependency for task {task.id}.")
 
+        self._apply_dependencies(dependency_edges, "Fallback")
+
         logger.info(f"[PrdParser Fallback] Basic parsing complete, attempted creation of {len(tasks_map)} tasks with numeric IDs.")
         # If LLM was attempted and failed, llm_error will contain the error message
         # Otherwise (no LLM client provided), llm_error will be None
         return tasks, llm_error 
     
+    def _apply_dependencies(self, edges: List[Tuple[str, str]], source: str) -> int:
+        """
+        批量写入依赖关系，返回成功写入的依赖数量。
+
+        整批依赖通过 storage.bulk_add_dependencies 只做一次循环检测；整批被拒绝时
+        （例如 LLM 给出的依赖中存在循环），退回逐条写入，只跳过有问题的依赖。
+
+        Args:
+            edges: (task_id, depends_on_id) 列表，表示 task_id 依赖 depends_on_id
+            source: 日志中标注的依赖来源（"LLM" 或 "Fallback"）
+        """
+        edges = list(dict.fromkeys(edges))
+        if not edges:
+            return 0
+
+        success, msg = self.storage.bulk_add_dependencies(edges)
+        if success:
+            return len(edges)
+
+        logger.warning(f"[PrdParser {source}] Batch dependency update rejected ({msg}); applying dependencies one by one.")
+        applied_count = 0
+        for task_id, depends_on_id in edges:
+            try:
+                success, msg = self.storage.set_task_dependency(task_id, depends_on_id)
+                if success:
+                    applied_count += 1
+                else:
+                    logger.warning(f"[PrdParser {source}] Failed setting dependency {task_id} -> {depends_on_id}: {msg}")
+            except Exception as set_dep_exc:
+                logger.error(f"[PrdParser {source}] Error setting dependency {task_id} -> {depends_on_id}: {set_dep_exc}", exc_info=True)
+        return applied_count
+
     async def parse_with_llm(self, prd_content: str) -> List[Task]:
         """
         使用配置的 LLMInterface 客户端的 parse_prd_to_tasks_async 方法解析PRD文档。
@@ -253,6 +282,8 @@ class PrdParser:
             
             # 用于生成新任务ID的计数器
             id_counters = {}
+            # 待批量创建的任务：(LLM 生成的原始ID, 任务名称, create_task 参数)
+            pending_tasks: List[Tuple[str, str, Dict[str, Any]]] = []
                     
             # Step 1: Create tasks using LLM-generated IDs
             for task_info in tasks_data:
@@ -328,37 +359,34 @@ class PrdParser:
                          llm_task_id = f"{original_llm_task_id}_{unique_suffix}"
                          logger.info(f"[PrdParser LLM] ID 冲突: 原始ID '{original_llm_task_id}' 已存在，生成新ID '{llm_task_id}'")
 
-                 logger.debug(f"[PrdParser LLM] Attempting to create task with ID: {llm_task_id}, Name: {task_name}")
-                 try:
-                     # ----> Pass the potentially modified ID to create_task <----
-                    task = self.storage.create_task(
-                        id=llm_task_id, # 使用可能修改过的ID
-                        name=task_name,
-                        description=task_info.get('description', ''),
-                        priority=task_priority,
-                        tags=tags,
-                        estimated_hours=est_hours
-                    )
-                    successful_tasks.append(task)
-                    # 记录LLM生成的原始ID与实际使用的ID的映射
-                    llm_id_to_task_id[original_llm_task_id] = task.id 
-                    # 将新创建的任务ID添加到已存在ID集合中
-                    existing_task_ids.add(task.id)
-                    # Map name to the actual ID for dependency resolution
-                    if task_name in task_id_map:
-                        logger.warning(f"[PrdParser LLM] Duplicate task name '{task_name}' detected from LLM. Dependency resolution might be ambiguous.")
-                    # Store the actual task ID, not the potentially duplicate LLM ID
-                    task_id_map[task_name] = task.id 
-                 except ValueError as ve:
-                      # Catch potential ID collision from TaskStorage
-                      logger.error(f"[PrdParser LLM] Failed to create task with ID {llm_task_id} for name '{task_name}' (ID might already exist): {ve}", exc_info=False) # Don't need full traceback for expected error
-                      # Map LLM ID to None to indicate failure
-                      llm_id_to_task_id[original_llm_task_id] = None 
-                 except Exception as create_exc:
-                      logger.error(f"[PrdParser LLM] Failed to create task with ID {llm_task_id} for name '{task_name}': {create_exc}", exc_info=True)
-                      # Map LLM ID to None
-                      llm_id_to_task_id[original_llm_task_id] = None 
-                      continue
+                 logger.debug(f"[PrdParser LLM] Queueing task for creation with ID: {llm_task_id}, Name: {task_name}")
+                 pending_tasks.append((original_llm_task_id, task_name, {
+                     "id": llm_task_id, # 使用可能修改过的ID
+                     "name": task_name,
+                     "description": task_info.get('description', ''),
+                     "priority": task_priority,
+                     "tags": tags,
+                     "estimated_hours": est_hours
+                 }))
+                 # 将即将创建的任务ID添加到已存在ID集合中，避免同一批次内的ID冲突
+                 existing_task_ids.add(llm_task_id)
+
+            # 批量创建所有任务，只写入一次文件；创建失败的任务（例如ID已存在）返回 None，错误已由存储层记录
+            created_tasks = self.storage.bulk_create([spec for _, _, spec in pending_tasks])
+            for (original_llm_task_id, task_name, spec), task in zip(pending_tasks, created_tasks):
+                if task is None:
+                    logger.error(f"[PrdParser LLM] Failed to create task with ID {spec['id']} for name '{task_name}'")
+                    # Map LLM ID to None to indicate failure
+                    llm_id_to_task_id[original_llm_task_id] = None
+                    continue
+                successful_tasks.append(task)
+                # 记录LLM生成的原始ID与实际使用的ID的映射
+                llm_id_to_task_id[original_llm_task_id] = task.id
+                # Map name to the actual ID for dependency resolution
+                if task_name in task_id_map:
+                    logger.warning(f"[PrdParser LLM] Duplicate task name '{task_name}' detected from LLM. Dependency resolution might be ambiguous.")
+                # Store the actual task ID, not the potentially duplicate LLM ID
+                task_id_map[task_name] = task.id
 
             # ----> NEW Step 2: Analyze dependencies with a second LLM call <----
             if successful_tasks:
@@ -424,7 +452,7 @@ class PrdParser:
 
                     if isinstance(dependency_data, list):
                         logger.info(f"[PrdParser LLM] Received {len(dependency_data)} dependency pairs from LLM.")
-                        applied_count = 0
+                        dependency_edges: List[Tuple[str, str]] = []
                         for dep_pair in dependency_data:
                             if not isinstance(dep_pair, dict) or 'task_id' not in dep_pair or 'depends_on_id' not in dep_pair:
                                 logger.warning(f"[PrdParser LLM] Skipping invalid dependency pair: {dep_pair}")
@@ -443,21 +471,11 @@ class PrdParser:
                             if depends_on_id not in task_lookup_by_id:
                                 logger.warning(f"[PrdParser LLM] Skipping dependency: Depends on ID '{depends_on_id}' not found.")
                                 continue
-                                
-                            # Attempt to set dependency
-                            try:
-                                logger.debug(f"[PrdParser LLM] Setting dependency from LLM: {task_id} -> {depends_on_id}")
-                                # 确保调用 set_task_dependency 时两个 ID 都存在于 task_lookup_by_id
-                                if task_id in task_lookup_by_id and depends_on_id in task_lookup_by_id:
-                                    success, msg = self.storage.set_task_dependency(task_id, depends_on_id)
-                                    if success:
-                                         applied_count += 1
-                                    elif msg != "Dependency already exists": # Don't warn if it just exists
-                                         logger.warning(f"[PrdParser LLM] Failed setting dependency from LLM: {task_id} -> {depends_on_id}: {msg}")
-                                else:
-                                    logger.warning(f"[PrdParser LLM] Skipping setting dependency because one or both tasks ({task_id}, {depends_on_id}) were not successfully created initially.")
-                            except Exception as set_dep_exc:
-                                logger.error(f"[PrdParser LLM] Error setting dependency from LLM: {task_id} -> {depends_on_id}: {set_dep_exc}", exc_info=True)
+
+                            logger.debug(f"[PrdParser LLM] Adding dependency from LLM: {task_id} -> {depends_on_id}")
+                            dependency_edges.append((task_id, depends_on_id))
+
+                        applied_count = self._apply_dependencies(dependency_edges, "LLM")
                         logger.info(f"[PrdParser LLM] Successfully applied {applied_count} dependency pairs from second LLM call.")
                     else:
                         logger.error(f"[PrdParser LLM] Dependency analysis LLM call did not return a list. Got: {type(dependency_data)}")
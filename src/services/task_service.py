@@ -107,6 +107,9 @@ class TaskService:
                 "error_code": "decompose_prd_error",
                 "error_details": error_details
             }
+        finally:
+            # 操作结束后统一保存变更
+            self.storage.flush()
     
     def add_task(self, name: str, description: str = "", **kwargs) -> Dict[str, Any]:
         """
@@ -162,6 +165,9 @@ class TaskService:
                 "error": f"Failed to add task: {str(e)}",
                 "error_code": "add_task_error"
             }
+        finally:
+            # 操作结束后统一保存变更
+            self.storage.flush()
     
     def update_task(self, task_id: str, **kwargs) -> Dict[str, Any]:
         """
@@ -209,7 +215,7 @@ class TaskService:
                             
                             subtask.updated_at = datetime.now()
                             if 'status' in update_data_for_subtask and subtask.status == TaskStatus.DONE:
-                                subtask.completed_at = datetime.now()
+                                subtask.completed_at = subtask.updated_at
                             
                             subtask_found = True
                             updated_subtask_object = subtask # 保存更新后的对象引用
@@ -390,6 +396,9 @@ class TaskService:
                 "error": f"Internal error updating task: {str(e)}",
                 "error_code": "internal_error"
             }
+        finally:
+            # 操作结束后统一保存变更
+            self.storage.flush()
     
     def _sync_parent_task_status(self, parent_task_id: str) -> None:
         """
@@ -497,6 +506,9 @@ class TaskService:
                 "error": f"Failed to set task dependency: {str(e)}",
                 "error_code": "set_dependency_error"
             }
+        finally:
+            # 操作结束后统一保存变更
+            self.storage.flush()
     
     def get_task_list(self,
                       status: Optional[str] = None,
@@ -651,6 +663,9 @@ class TaskService:
                 "error": f"Failed to mark task as done: {str(e)}",
                 "error_code": "mark_task_done_error"
             }
+        finally:
+            # 操作结束后统一保存变更
+            self.storage.flush()
     
     def get_tasks_by_status(self) -> Dict[str, Any]:
         """
@@ -770,6 +785,9 @@ class TaskService:
                 "error": f"Error updating code references for task {task_id}: {e}",
                 "error_code": "update_code_reference_error"
             }
+        finally:
+            # 操作结束后统一保存变更
+            self.storage.flush()
     
     async def expand_task(
         self,
@@ -901,4 +919,7 @@ class TaskService:
                 "success": False,
                 "error": f"Failed to generate subtasks: {str(e)}",
                 "parent_task": parent_task_dict # 返回原始父任务信息
-            } 
\ No newline at end of file
+            }
+        finally:
+            # 操作结束后统一保存变更
+            self.storage.flush() 
\ No newline at end of file
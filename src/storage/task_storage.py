@@ -2,17 +2,41 @@
 任务存储层
 
 提供任务数据的存储和检索功能。
-使用 JSON 文件进行持久化存储。
+使用 JSON 文件进行持久化存储；设置环境变量 TASK_STORAGE_MSGPACK 且安装了 msgpack 时
+改用体积更小、解析更快的 msgpack 二进制文件。
 """
 
+import asyncio
 import uuid
+from enum import Enum
+from collections import defaultdict, deque
 import sys
 import os
-from typing import Dict, List, Optional, Set, Tuple, Union
+import atexit
+import heapq
+import bisect
+import weakref
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 from datetime import datetime
+from operator import attrgetter, itemgetter
 import logging
 import json
 
+try:
+    import ijson
+except ImportError:  # 未安装 ijson 时退回到一次性解析整个文件
+    ijson = None
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时使用标准库 json
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # 未安装 msgpack 时只支持 JSON 格式
+    msgpack = None
+
 # 将项目根目录添加到Python路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
@@ -24,14 +48,68 @@ except (ImportError, ValueError):
 
 logger = logging.getLogger(__name__)
 
+# _dict_to_task 读取的字段及缺失时的默认值，补齐默认值后用 itemgetter 一次取出全部字段
+_TASK_DICT_DEFAULTS: Dict[str, Any] = {
+    'id': '',
+    'name': '',
+    'description': '',
+    'status': 'todo',
+    'priority': 'medium',
+    'complexity': 'medium',
+    'dependencies': (),
+    'blocked_by': (),
+    'tags': (),
+    'assigned_to': None,
+    'estimated_hours': None,
+    'actual_hours': None,
+    'code_references': (),
+    'subtasks': (),
+    'parent_task_id': None,
+    'created_at': None,
+    'updated_at': None,
+    'completed_at': None,
+}
+_get_task_fields = itemgetter(*_TASK_DICT_DEFAULTS)
+
+
+def _parse_ts(value: Optional[str], default: Optional[datetime]) -> Optional[datetime]:
+    """解析 ISO 格式的时间字符串，为空或格式无效时返回默认值"""
+    if not value:
+        return default
+    try:
+        return datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        return default
+
+
+# 已创建的存储实例（弱引用，不会让实例在不再使用后仍驻留内存），进程退出前统一保存其未写入的变更
+_live_storages: "weakref.WeakSet[TaskStorage]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_storages() -> None:
+    """进程退出前保存所有仍存活的存储实例中未写入的变更"""
+    for storage in list(_live_storages):
+        storage.flush()
+
+
+def _intern(value: Any) -> Any:
+    """驻留字符串；枚举成员（TaskStatus 等是 str 的子类，不能直接驻留）先取其值"""
+    if isinstance(value, Enum):
+        value = value.value
+    return sys.intern(value) if type(value) is str else value
+
+
 class TaskStorage:
     """任务 JSON 文件存储类"""
     
-    def __init__(self, tasks_dir: str = None):
+    def __init__(self, tasks_dir: str = None, fsync_interval: float = 0.2, fsync_threshold: int = 64):
         """初始化任务存储
         
         Args:
             tasks_dir: 任务 JSON 文件存储目录，若为 None 则使用默认目录
+            fsync_interval: 变更发生后延迟写入文件的时间（秒）
+            fsync_threshold: 累计多少次变更后立即写入文件
         """
         # 如果未指定目录，使用默认路径
         if tasks_dir is None:
@@ -44,51 +122,120 @@ class TaskStorage:
         # 确保目录存在
         os.makedirs(self.tasks_dir, exist_ok=True)
         
-        self.master_file_path = os.path.join(self.tasks_dir, "all_tasks.json")
+        # 持久化格式：默认 JSON，可通过环境变量切换为 msgpack
+        self._format = 'msgpack' if os.environ.get('TASK_STORAGE_MSGPACK') and msgpack is not None else 'json'
+        self.master_file_path = os.path.join(self.tasks_dir, f"all_tasks.{self._format}")
+        
+        # 切换到 msgpack 格式后首次启动时，先迁移已有的 JSON 任务文件，避免以空任务列表启动；
+        # 迁移失败时直接抛出异常，不在丢失数据的状态下继续运行
+        json_file_path = os.path.join(self.tasks_dir, "all_tasks.json")
+        if (
+            self._format == 'msgpack'
+            and not os.path.exists(self.master_file_path)
+            and os.path.exists(json_file_path)
+        ):
+            migrate_json_to_msgpack(self.tasks_dir)
         
         # 任务字典 (内存缓存)
         self.tasks: Dict[str, Task] = {}
-        # 依赖关系图（任务ID -> 被该任务阻塞的任务ID集合）
-        self.dependency_graph: Dict[str, Set[str]] = {}
+        # 依赖关系图（任务ID -> 被该任务阻塞的任务ID集合），写入时自动创建空集合；
+        # 只读访问请使用 .get()，避免为不存在的任务ID创建条目
+        self.dependency_graph: Dict[str, Set[str]] = defaultdict(set)
+        # 子任务ID -> 子任务对象，随子任务增删增量维护
+        self._subtask_index: Dict[str, Task] = {}
+        
+        # 二级索引（主任务及其子任务），随任务变更增量维护，避免筛选时全量扫描
+        self._by_status: Dict[TaskStatus, Set[str]] = {status: set() for status in TaskStatus}
+        self._by_priority: Dict[TaskPriority, Set[str]] = {priority: set() for priority in TaskPriority}
+        self._by_assignee: Dict[str, Set[str]] = {}
+        self._by_tag: Dict[str, Set[str]] = {}
+        # 没有被阻塞的任务ID集合
+        self._unblocked: Set[str] = set()
+        # 可执行主任务ID集合（状态为 todo/in_progress 且没有被阻塞），随索引增量维护
+        self._ready_parents: Set[str] = set()
+        # 任务ID -> 写入索引时的 (状态, 负责人, 标签, 优先级)，用于从旧位置移除及判断排序是否受影响
+        self._indexed: Dict[str, Tuple[TaskStatus, Optional[str], Tuple[str, ...], TaskPriority]] = {}
+        # 可执行主任务的排序结果缓存，主任务的排序依据发生变化时置为 None
+        self._exec_ranking: Optional[List[Task]] = None
+        # 缓存的排序结果包含的最大任务数量（只保留前 limit 个）
+        self._exec_ranking_limit = 0
+        # 主任务ID -> 保存时生成的字典（包含子任务），任务或其子任务变更时失效
+        self._dict_cache: Dict[str, Dict] = {}
+        # 按ID排序的全部任务ID，首次无筛选分页时构建，之后随增删用二分插入/删除维护
+        self._sorted_ids: Optional[List[str]] = None
+        # 下一个可用的数字顶级任务ID（只增不减，避免复用已删除任务的ID）
+        self._next_top_id = 1
+        # 任务ID -> 其直接和间接依赖的任务ID集合，循环检测时按需计算，依赖关系变化时失效
+        self._transitive_deps: Dict[str, Set[str]] = {}
+        
+        # 内存中是否有尚未写入文件的变更，由事件循环中的延迟写入或 flush() 统一保存
+        self._dirty = False
+        self._pending_ops = 0
+        self.fsync_interval = fsync_interval
+        self.fsync_threshold = fsync_threshold
+        # 已安排的延迟写入及其所属的事件循环
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_loop: Optional[asyncio.AbstractEventLoop] = None
         
         # 从文件加载任务
         self._load_tasks_from_file()
+        
+        # 进程退出前保存未写入的变更
+        _live_storages.add(self)
     
     def _load_tasks_from_file(self) -> None:
-        """从主任务 JSON 文件加载所有任务"""
+        """从主任务文件加载所有任务"""
         if not os.path.exists(self.master_file_path):
             logger.info(f"主任务文件不存在，将创建新文件: {self.master_file_path}")
             return
         
         try:
-            with open(self.master_file_path, 'r', encoding='utf-8') as f:
-                tasks_data = json.load(f)
+            with open(self.master_file_path, 'rb') as f:
+                if self._format == 'json' and ijson is not None:
+                    # 流式解析：逐个解码任务字典并转换为 Task，避免整棵 JSON 树同时驻留内存
+                    tasks_data = ijson.items(f, 'item', use_float=True)
+                elif self._format == 'msgpack':
+                    tasks_data = msgpack.unpackb(f.read(), raw=False)
+                else:
+                    tasks_data = orjson.loads(f.read()) if orjson is not None else json.load(f)
                 
-            # 清空当前缓存
-            self.tasks.clear()
-            self.dependency_graph.clear()
-            
-            # 加载主任务及其子任务
-            for task_dict in tasks_data:
-                task_id = task_dict.get('id')
-                if not task_id or '.' in task_id: # 只处理主任务ID
-                    logger.warning(f"跳过无效或非主任务数据: {task_dict}")
-                    continue
+                # 先解析到局部字典：流式解析遇到截断或损坏的文件时会在中途抛出异常，
+                # 整个文件解析成功后才替换当前数据，避免只加载一部分任务且索引未建立
+                loaded_tasks: Dict[str, Task] = {}
                 
-                try:
-                    # 创建任务对象 (包含递归创建的子任务Task对象)
-                    task = self._dict_to_task(task_dict)
+                # 加载主任务及其子任务
+                for task_dict in tasks_data:
+                    task_id = task_dict.get('id')
+                    if not task_id or '.' in task_id: # 只处理主任务ID
+                        logger.warning(f"跳过无效或非主任务数据: {task_dict}")
+                        continue
                     
-                    # 存储主任务
-                    self.tasks[task_id] = task
-                    logger.debug(f"主任务 {task_id} 已加载，包含 {len(task.subtasks)} 个子任务对象")
+                    try:
+                        # 创建任务对象 (包含递归创建的子任务Task对象)
+                        task = self._dict_to_task(task_dict)
+                        
+                        loaded_tasks[task_id] = task
+                        logger.debug("主任务 %s 已加载，包含 %d 个子任务对象", task_id, len(task.subtasks))
 
-                except Exception as load_e:
-                    logger.error(f"加载任务 {task_id} 失败: {load_e}", exc_info=True)
-                    continue # 继续加载下一个任务
+                    except Exception as load_e:
+                        logger.error(f"加载任务 {task_id} 失败: {load_e}", exc_info=True)
+                        continue # 继续加载下一个任务
+            
+            # 清空当前缓存后存储主任务、登记其子任务，并构建反向依赖图
+            self.tasks.clear()
+            self.dependency_graph.clear()
+            self._subtask_index.clear()
+            self._clear_indexes()
+            self.tasks.update(loaded_tasks)
+            for task in loaded_tasks.values():
+                self._link_dependencies(task)
+                for subtask in task.subtasks:
+                    self._subtask_index[subtask.id] = subtask
+                    self._link_dependencies(subtask)
             
-            # 所有主任务及其子任务对象加载完毕后，重建依赖图
-            self._rebuild_dependency_graph()
+            # 建立二级索引
+            for task in self._iter_all_tasks():
+                self._index_task(task)
             
             logger.info(f"从文件加载了 {len(self.tasks)} 个主任务及其子任务")
             
@@ -97,101 +244,202 @@ class TaskStorage:
     
     def _dict_to_task(self, task_dict: Dict) -> Task:
         """将任务字典转换为 Task 对象"""
-        # 获取依赖和被阻塞关系
-        dependencies = set(task_dict.get('dependencies', []))
-        blocked_by = set(task_dict.get('blocked_by', []))
-        
-        # 确保blocked_by包含所有依赖
-        for dep_id in dependencies:
-            blocked_by.add(dep_id)
+        (
+            task_id, name, description, status, priority, complexity,
+            dependencies, blocked_by, tags, assigned_to, estimated_hours, actual_hours,
+            code_references, subtasks_data, parent_task_id,
+            created_at, updated_at, completed_at,
+        ) = _get_task_fields({**_TASK_DICT_DEFAULTS, **task_dict})
+        
+        # 获取依赖和被阻塞关系（确保blocked_by包含所有依赖）
+        dependencies = set(dependencies)
+        blocked_by = set(blocked_by)
+        blocked_by |= dependencies
         
         # 处理子任务（将字典列表转换为Task对象列表）
-        subtasks_data = task_dict.get('subtasks', [])
         subtasks = []
         if isinstance(subtasks_data, list):
             for sub_dict in subtasks_data:
-                if isinstance(sub_dict, dict):
+                # 数据来自反序列化的 JSON，子任务只可能是字典
+                if type(sub_dict) is dict:
                     try:
                         subtasks.append(self._dict_to_task(sub_dict)) # 递归调用
                     except Exception as e:
                         logger.error(f"转换子任务字典失败 ({sub_dict.get('id')}): {e}")
-                elif isinstance(sub_dict, Task): # 如果已经是Task对象，直接添加
-                    subtasks.append(sub_dict)
 
+        # 驻留重复出现的短字符串（状态、优先级、标签、负责人），
+        # 大量任务共享同一个字符串对象，减少内存占用并加快比较
         task = Task(
-            id=task_dict.get('id', ''),
-            name=task_dict.get('name', ''),
-            description=task_dict.get('description', ''),
-            status=task_dict.get('status', 'todo'),
-            priority=task_dict.get('priority', 'medium'),
-            complexity=task_dict.get('complexity', 'medium'),
+            id=task_id,
+            name=name,
+            description=description,
+            status=_intern(status),
+            priority=_intern(priority),
+            complexity=_intern(complexity),
             dependencies=dependencies,
             blocked_by=blocked_by,
-            tags=task_dict.get('tags', []), 
-            assigned_to=task_dict.get('assigned_to'),
-            estimated_hours=task_dict.get('estimated_hours'),
-            actual_hours=task_dict.get('actual_hours'),
-            code_references=task_dict.get('code_references', []),
+            tags=[_intern(tag) for tag in tags], 
+            assigned_to=_intern(assigned_to) if assigned_to else assigned_to,
+            estimated_hours=estimated_hours,
+            actual_hours=actual_hours,
+            code_references=list(code_references),
             subtasks=subtasks, # 传入转换后的Task对象列表
-            parent_task_id=task_dict.get('parent_task_id') # 确保父任务ID也被处理
+            parent_task_id=parent_task_id # 确保父任务ID也被处理
         )
         
-        # 设置时间字段
-        if 'created_at' in task_dict and task_dict['created_at']:
-            try:
-                task.created_at = datetime.fromisoformat(task_dict['created_at'])
-            except (ValueError, TypeError):
-                task.created_at = datetime.now()
-                
-        if 'updated_at' in task_dict and task_dict['updated_at']:
-            try:
-                task.updated_at = datetime.fromisoformat(task_dict['updated_at'])
-            except (ValueError, TypeError):
-                task.updated_at = datetime.now()
-                
-        if 'completed_at' in task_dict and task_dict['completed_at']:
-            try:
-                task.completed_at = datetime.fromisoformat(task_dict['completed_at'])
-            except (ValueError, TypeError):
-                task.completed_at = None
+        # 设置时间字段（缺失或无法解析时保留默认值）
+        task.created_at = _parse_ts(created_at, task.created_at)
+        task.updated_at = _parse_ts(updated_at, task.updated_at)
+        task.completed_at = _parse_ts(completed_at, None)
         
         return task
     
-    def _rebuild_dependency_graph(self) -> None:
-        """重建依赖关系图"""
-        self.dependency_graph.clear()
+    def _link_dependencies(self, task: Task) -> None:
+        """将任务的依赖关系写入依赖图"""
+        self.dependency_graph[task.id]  # 确保任务自身有条目（访问即创建空集合）
+        self._forget_transitive_deps(task.id)
+        for dep_id in task.dependencies:
+            self.dependency_graph[dep_id].add(task.id)
+            self._dependents_changed(dep_id)
+    
+    def _unlink_dependencies(self, task: Task) -> None:
+        """从依赖图中移除任务的依赖关系"""
+        self._forget_transitive_deps(task.id)
+        for dep_id in task.dependencies & self.dependency_graph.keys():
+            self.dependency_graph[dep_id].discard(task.id)
+            self._dependents_changed(dep_id)
+    
+    def _dependents_changed(self, task_id: str) -> None:
+        """依赖某个任务的任务集合发生变化；若它是主任务，其排序依据随之改变"""
+        if task_id in self.tasks:
+            self._exec_ranking = None
+    
+    def _forget_transitive_deps(self, task_id: str) -> None:
+        """任务的依赖集合发生变化，移除所有可能经过该任务的传递依赖缓存"""
+        if not self._transitive_deps:
+            return
+        stale = [
+            cached_id for cached_id, deps in self._transitive_deps.items()
+            if cached_id == task_id or task_id in deps
+        ]
+        for cached_id in stale:
+            del self._transitive_deps[cached_id]
+    
+    def _clear_indexes(self) -> None:
+        """清空所有二级索引"""
+        for ids in self._by_status.values():
+            ids.clear()
+        for ids in self._by_priority.values():
+            ids.clear()
+        self._by_assignee.clear()
+        self._by_tag.clear()
+        self._unblocked.clear()
+        self._ready_parents.clear()
+        self._indexed.clear()
+        self._exec_ranking = None
+        self._dict_cache.clear()
+        self._sorted_ids = None
+        self._next_top_id = 1
+        self._transitive_deps.clear()
+    
+    def _index_task(self, task: Task) -> None:
+        """将任务写入二级索引，若任务已被索引则先移除旧条目"""
+        old_entry = self._remove_index_entry(task.id)
+        was_unblocked = old_entry is not None and old_entry[4]
+        
+        status = TaskStatus(task.status)
+        priority = TaskPriority(task.priority)
+        tags = tuple(task.tags)
+        
+        self._by_status[status].add(task.id)
+        self._by_priority[priority].add(task.id)
+        if task.assigned_to:
+            self._by_assignee.setdefault(task.assigned_to, set()).add(task.id)
+        for tag in tags:
+            self._by_tag.setdefault(tag, set()).add(task.id)
+        if not task.blocked_by:
+            self._unblocked.add(task.id)
+            if (
+                (status is TaskStatus.TODO or status is TaskStatus.IN_PROGRESS)
+                and task._is_main_task and task.id in self.tasks
+            ):
+                self._ready_parents.add(task.id)
+        
+        self._indexed[task.id] = (status, task.assigned_to, tags, priority)
+        if old_entry is None:
+            if self._sorted_ids is not None:
+                bisect.insort(self._sorted_ids, task.id)
+            top_id = task.id.split(".", 1)[0]
+            if top_id.isdigit() and int(top_id) >= self._next_top_id:
+                self._next_top_id = int(top_id) + 1
+        
+        # 只有主任务的状态、优先级或阻塞情况变化才会影响可执行主任务的排序
+        if task.id in self.tasks and (
+            old_entry is None
+            or old_entry[0] != status
+            or old_entry[3] != priority
+            or was_unblocked != (not task.blocked_by)
+        ):
+            self._exec_ranking = None
+    
+    def _unindex_task(self, task_id: str) -> None:
+        """从二级索引中移除任务"""
+        if self._remove_index_entry(task_id) is None:
+            return
+        if task_id in self.tasks:
+            self._exec_ranking = None
+        if self._sorted_ids is not None:
+            pos = bisect.bisect_left(self._sorted_ids, task_id)
+            if pos < len(self._sorted_ids) and self._sorted_ids[pos] == task_id:
+                del self._sorted_ids[pos]
+    
+    def _remove_index_entry(self, task_id: str) -> Optional[Tuple]:
+        """从二级索引中移除任务，返回旧的索引条目及是否曾处于未阻塞集合"""
+        # 任务即将变更或被删除，所属主任务的序列化缓存失效
+        self._dict_cache.pop(task_id if task_id in self.tasks else task_id.split(".")[0], None)
         
-        # 处理主任务依赖
-        for task_id, task in self.tasks.items():
-            self.dependency_graph[task_id] = set()
-            
-            # 添加依赖关系
-            for dep_id in task.dependencies:
-                if dep_id in self.tasks:
-                    if dep_id not in self.dependency_graph:
-                        self.dependency_graph[dep_id] = set()
-                    self.dependency_graph[dep_id].add(task_id)
-        
-        # 处理子任务依赖
-        for task_id, task in self.tasks.items():
-            if hasattr(task, 'subtasks') and isinstance(task.subtasks, list):
-                for subtask in task.subtasks:
-                    if not isinstance(subtask, Task):
-                        continue
-                    
-                    subtask_id = subtask.id
-                    if not subtask_id:
-                        continue
-                    
-                    # 确保存在依赖图条目
-                    if subtask_id not in self.dependency_graph:
-                        self.dependency_graph[subtask_id] = set()
-                    
-                    # 添加子任务的依赖关系
-                    for dep_id in subtask.dependencies:
-                        if dep_id not in self.dependency_graph:
-                            self.dependency_graph[dep_id] = set()
-                        self.dependency_graph[dep_id].add(subtask_id)
+        entry = self._indexed.pop(task_id, None)
+        if entry is None:
+            return None
+        
+        status, assigned_to, tags, priority = entry
+        self._by_status[status].discard(task_id)
+        self._by_priority[priority].discard(task_id)
+        if assigned_to and assigned_to in self._by_assignee:
+            self._by_assignee[assigned_to].discard(task_id)
+            if not self._by_assignee[assigned_to]:
+                del self._by_assignee[assigned_to]
+        for tag in tags:
+            if tag in self._by_tag:
+                self._by_tag[tag].discard(task_id)
+                if not self._by_tag[tag]:
+                    del self._by_tag[tag]
+        was_unblocked = task_id in self._unblocked
+        self._unblocked.discard(task_id)
+        self._ready_parents.discard(task_id)
+        
+        return (status, assigned_to, tags, priority, was_unblocked)
+    
+    def _reindex_task(self, task: Task) -> None:
+        """刷新已被索引任务的索引条目（状态、负责人、标签或阻塞关系变化后调用）"""
+        if task.id in self._indexed:
+            self._index_task(task)
+    
+    def next_task_id(self) -> str:
+        """返回下一个顺延的数字任务ID（当前最大数字ID + 1，没有数字ID时为 "1"）"""
+        return str(self._next_top_id)
+    
+    def _iter_all_tasks(self) -> Iterator[Task]:
+        """依次遍历所有主任务及其直接子任务"""
+        for task in self.tasks.values():
+            yield task
+            yield from task.subtasks
+    
+    def _unindex_task_tree(self, task: Task) -> None:
+        """从索引中移除主任务及其直接子任务"""
+        self._unindex_task(task.id)
+        for subtask in task.subtasks:
+            self._unindex_task(subtask.id)
     
     def _task_to_dict(self, task: Task) -> Dict:
         """将 Task 对象（包括子任务）转换为适合JSON序列化的字典"""
@@ -221,28 +469,93 @@ class TaskStorage:
         }
 
         # --- 修复: 递归处理子任务 --- 
-        if hasattr(task, 'subtasks') and isinstance(task.subtasks, list):
-            task_dict['subtasks'] = [self._task_to_dict(sub) for sub in task.subtasks if isinstance(sub, Task)]
+        task_dict['subtasks'] = [self._task_to_dict(sub) for sub in task.subtasks]
         
         return task_dict
     
-    def _save_tasks_to_file(self) -> None:
-        """将所有任务保存到主任务 JSON 文件"""
+    def _save_tasks_to_file(self, durable: bool = False) -> bool:
+        """将所有任务保存到主任务 JSON 文件，返回是否保存成功
+        
+        先写入同目录下的临时文件再原子替换主文件，避免写入中断时留下残缺文件。
+        
+        Args:
+            durable: 为 True 时在替换前调用 fsync，确保数据落盘
+        """
         try:
             tasks_data = []
             # 只迭代主任务进行保存
-            for task_id, task in self.tasks.items():
-                if "." not in task_id: 
+            for task in self.tasks.values():
+                if task._is_main_task:
                     # --- 修复: 直接使用 _task_to_dict 返回的完整字典 --- 
-                    tasks_data.append(self._task_to_dict(task))
+                    # 未变更的主任务复用上次保存时生成的字典
+                    task_dict = self._dict_cache.get(task.id)
+                    if task_dict is None:
+                        task_dict = self._dict_cache[task.id] = self._task_to_dict(task)
+                    tasks_data.append(task_dict)
+            
+            # 序列化为字节（msgpack 二进制，或 UTF-8 JSON，orjson 直接输出字节）
+            if self._format == 'msgpack':
+                content = msgpack.packb(tasks_data, use_bin_type=True)
+            elif orjson is not None:
+                content = orjson.dumps(tasks_data, option=orjson.OPT_INDENT_2)
+            else:
+                content = json.dumps(tasks_data, ensure_ascii=False, indent=2).encode('utf-8')
             
-            # 写入文件
-            with open(self.master_file_path, 'w', encoding='utf-8') as f:
-                json.dump(tasks_data, f, ensure_ascii=False, indent=2)
+            # 写入临时文件后原子替换主文件
+            tmp_path = self.master_file_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self.master_file_path)
                 
-            logger.debug(f"所有主任务及其子任务已递归转换为字典并保存到文件: {self.master_file_path}")
+            logger.debug("所有主任务及其子任务已递归转换为字典并保存到文件: %s", self.master_file_path)
+            return True
         except Exception as e:
             logger.error(f"保存任务到文件失败: {str(e)}", exc_info=True)
+            return False
+    
+    def _schedule_flush(self) -> None:
+        """标记存在未保存的变更，并安排延迟写入（变更次数达到阈值时立即写入）
+        
+        延迟写入由当前线程正在运行的事件循环调度，与修改任务的代码在同一线程中执行，
+        保存时任务数据不会被并发修改；没有运行中的事件循环时立即写入。
+        """
+        self._dirty = True
+        self._pending_ops += 1
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        
+        if loop is None or self._pending_ops >= self.fsync_threshold:
+            self.flush()
+            return
+        
+        # 已安排的延迟写入属于已结束的事件循环时不会再执行，需要在当前循环中重新安排
+        if self._flush_handle is None or self._flush_loop is not loop:
+            self._flush_handle = loop.call_later(self.fsync_interval, self.flush)
+            self._flush_loop = loop
+    
+    def flush(self, durable: bool = False) -> None:
+        """将尚未保存的变更写入主任务文件
+        
+        Args:
+            durable: 为 True 时写入后调用 fsync，确保数据落盘
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        
+        if not self._dirty:
+            return
+        
+        self._dirty = False
+        self._pending_ops = 0
+        if not self._save_tasks_to_file(durable=durable):
+            self._dirty = True
     
     def create_task(
         self, 
@@ -258,6 +571,30 @@ class TaskStorage:
         code_references: List[str] = None
     ) -> Task:
         """创建新任务"""
+        task = self._create_task(
+            name, description, id, priority, complexity, tags,
+            assigned_to, estimated_hours, dependencies, code_references
+        )
+        
+        # 安排延迟写入，多次变更合并为一次文件写入
+        self._schedule_flush()
+        
+        return task
+    
+    def _create_task(
+        self, 
+        name: str, 
+        description: str = "", 
+        id: Optional[str] = None,
+        priority: TaskPriority = TaskPriority.MEDIUM,
+        complexity: TaskComplexity = TaskComplexity.MEDIUM,
+        tags: List[str] = None,
+        assigned_to: Optional[str] = None,
+        estimated_hours: Optional[float] = None,
+        dependencies: List[str] = None,
+        code_references: List[str] = None
+    ) -> Task:
+        """创建任务并更新依赖图和索引，不安排文件写入（参数与 create_task 相同）"""
         task_id = id if id is not None else str(uuid.uuid4())
         
         if id is not None and task_id in self.tasks:
@@ -268,6 +605,8 @@ class TaskStorage:
         task_dependencies = set(dependencies or [])
         
         # 创建任务对象
+        # 创建时间与更新时间使用同一个时间戳
+        now = datetime.now()
         task = Task(
             id=task_id,
             name=name,
@@ -277,8 +616,8 @@ class TaskStorage:
             complexity=complexity,
             dependencies=task_dependencies,
             blocked_by=set(),  # 初始无阻塞
-            created_at=datetime.now(),
-            updated_at=datetime.now(),
+            created_at=now,
+            updated_at=now,
             tags=task_tags,
             assigned_to=assigned_to,
             estimated_hours=estimated_hours,
@@ -286,18 +625,15 @@ class TaskStorage:
         )
         
         # 判断是否为子任务
-        if "." in task_id:
+        if not task._is_main_task:
             # 寻找父任务
             parent_id = task_id.split(".")[0]
             parent_task = self.tasks.get(parent_id)
             
             if parent_task:
-                # 初始化父任务的子任务列表（如果不存在）
-                if not hasattr(parent_task, 'subtasks') or parent_task.subtasks is None:
-                    parent_task.subtasks = []
-                
                 # 添加到父任务的子任务列表
                 parent_task.subtasks.append(task)
+                self._subtask_index[task_id] = task
                 logger.info(f"子任务 {task_id} 已添加到父任务 {parent_id}")
             else:
                 logger.warning(f"未找到子任务 {task_id} 的父任务 {parent_id}，将作为独立任务处理")
@@ -307,79 +643,54 @@ class TaskStorage:
             # 主任务直接存储
             self.tasks[task_id] = task
         
-        # 更新依赖关系图
-        self.dependency_graph[task_id] = set()
+        # 更新依赖关系图（反向边与任务的 dependencies 保持一一对应，
+        # 保留此前声明了依赖当前任务ID的任务）
+        self._link_dependencies(task)
         
         # 处理依赖关系
         if task_dependencies:
             for dep_id in task_dependencies:
-                # 查找依赖是主任务还是子任务
-                if dep_id in self.tasks:  # 主任务
-                    # 更新依赖图
-                    if dep_id not in self.dependency_graph:
-                        self.dependency_graph[dep_id] = set()
-                    self.dependency_graph[dep_id].add(task_id)
-                    # 更新被阻塞状态
+                # 依赖可以是主任务或子任务，均通过索引直接查找；只有已存在的任务才会阻塞当前任务
+                if dep_id in self.tasks or dep_id in self._subtask_index:
                     task.add_blocked_by(dep_id)
-                else:
-                    # 检查是否为某个主任务的子任务
-                    found = False
-                    for main_task in self.tasks.values():
-                        if hasattr(main_task, 'subtasks') and isinstance(main_task.subtasks, list):
-                            for subtask in main_task.subtasks:
-                                if isinstance(subtask, Task) and subtask.id == dep_id:
-                                    # 更新依赖图
-                                    if dep_id not in self.dependency_graph:
-                                        self.dependency_graph[dep_id] = set()
-                                    self.dependency_graph[dep_id].add(task_id)
-                                    # 更新被阻塞状态
-                                    task.add_blocked_by(dep_id)
-                                    found = True
-                                    break
-                        if found:
-                            break
-        
-        # 保存到文件
-        self._save_tasks_to_file()
+        
+        # 更新二级索引
+        self._index_task(task)
         
         return task
     
-    def get_task(self, task_id: str) -> Optional[Task]:
-        """获取任务信息
+    def bulk_create(self, specs: List[Dict[str, Any]]) -> List[Optional[Task]]:
+        """批量创建任务，所有任务创建完成后只安排一次文件写入
         
-        先从内存中查找主任务，如果是子任务则在父任务的子任务列表中查找
-        """
-        # 检查是否为主任务
-        if task_id in self.tasks:
-            return self.tasks[task_id]
+        单个任务创建失败（例如ID已存在）时记录错误并跳过，不影响其余任务。
         
-        # 如果是子任务，找到父任务然后在子任务列表中查找
-        if "." in task_id:
-            parent_id = task_id.split(".")[0]
-            parent_task = self.tasks.get(parent_id)
-            
-            found_subtask = None
-            if parent_task and hasattr(parent_task, 'subtasks') and isinstance(parent_task.subtasks, list):
-                for subtask in parent_task.subtasks:
-                    if isinstance(subtask, Task) and subtask.id == task_id:
-                        found_subtask = subtask
-                        break
-            
-            # 如果第一次查找失败，尝试重新加载数据再查找一次 (处理可能的缓存问题)
-            if not found_subtask:
-                logger.warning(f"第一次查找子任务 {task_id} 失败，尝试重新加载数据...")
-                self._load_tasks_from_file() # 强制重新加载
-                parent_task = self.tasks.get(parent_id) # 重新获取父任务
-                if parent_task and hasattr(parent_task, 'subtasks') and isinstance(parent_task.subtasks, list):
-                    for subtask in parent_task.subtasks:
-                        if isinstance(subtask, Task) and subtask.id == task_id:
-                            logger.info(f"重新加载后成功找到子任务 {task_id}")
-                            found_subtask = subtask
-                            break
+        Args:
+            specs: 任务参数字典列表，每个字典的键与 create_task 的参数相同
             
-            return found_subtask # 返回找到的子任务或 None
+        Returns:
+            List[Optional[Task]]: 与 specs 一一对应的任务列表，创建失败的位置为 None
+        """
+        tasks: List[Optional[Task]] = []
+        for spec in specs:
+            try:
+                tasks.append(self._create_task(**spec))
+            except Exception as e:
+                logger.error(f"批量创建任务 {spec.get('id')} 失败: {e}")
+                tasks.append(None)
+        
+        if any(task is not None for task in tasks):
+            self._schedule_flush()
+        return tasks
+    
+    def get_task(self, task_id: str) -> Optional[Task]:
+        """获取任务信息
         
-        return None
+        主任务直接从任务字典中获取，子任务从子任务索引中获取
+        """
+        task = self.tasks.get(task_id)
+        if task is None:
+            task = self._subtask_index.get(task_id)
+        return task
     
     def update_task(self, task_id: str, **kwargs) -> Optional[Task]:
         """更新任务信息"""
@@ -387,6 +698,9 @@ class TaskStorage:
         if not task:
             return None
         
+        # 记录原有子任务列表，用于刷新索引
+        old_subtasks = list(task.subtasks)
+        
         # 处理可更新的字段
         for field, value in kwargs.items():
             if field == "subtasks":
@@ -418,9 +732,31 @@ class TaskStorage:
         
         # 更新时间戳
         task.updated_at = datetime.now()
-        
-        # 保存到文件
-        self._save_tasks_to_file()
+        task.refresh_ranks()
+        
+        if "dependencies" in kwargs:
+            self._forget_transitive_deps(task_id)
+        
+        # 子任务列表被替换时，同步依赖图中子任务的依赖关系
+        if "subtasks" in kwargs:
+            for subtask in old_subtasks:
+                self._unlink_dependencies(subtask)
+            for subtask in task.subtasks:
+                self._link_dependencies(subtask)
+        
+        # 刷新二级索引（子任务可能被替换，或其属性已被调用方直接修改）
+        if "subtasks" in kwargs and task_id in self.tasks:
+            for subtask in old_subtasks:
+                self._subtask_index.pop(subtask.id, None)
+                self._unindex_task(subtask.id)
+            for subtask in task.subtasks:
+                subtask.refresh_ranks()
+                self._subtask_index[subtask.id] = subtask
+                self._index_task(subtask)
+        self._reindex_task(task)
+        
+        # 安排延迟写入，多次变更合并为一次文件写入
+        self._schedule_flush()
         
         return task
     
@@ -432,41 +768,47 @@ class TaskStorage:
             return False
         
         # 清理依赖关系
-        dependencies = task.dependencies
-        for dep_id in dependencies:
-            if dep_id in self.dependency_graph:
-                self.dependency_graph[dep_id].discard(task_id)
+        self._unlink_dependencies(task)
         
         # 清理被阻塞关系
-        blocked_tasks = self.dependency_graph.get(task_id, set())
+        blocked_tasks = self.dependency_graph.pop(task_id, set())
         for blocked_id in blocked_tasks:
             blocked_task = self.get_task(blocked_id)
             if blocked_task:
                 blocked_task.blocked_by.discard(task_id)
+                self._reindex_task(blocked_task)
+        
+        # 从二级索引中移除（主任务连同其子任务一起移除）
+        if task_id in self.tasks:
+            self._unindex_task_tree(task)
+            for subtask in task.subtasks:
+                self._subtask_index.pop(subtask.id, None)
+                # 子任务随主任务一起删除，同时清理其在依赖图中的正反向记录
+                self._unlink_dependencies(subtask)
+                self.dependency_graph.pop(subtask.id, None)
+        else:
+            self._unindex_task(task_id)
+            self._subtask_index.pop(task_id, None)
         
         # 判断是主任务还是子任务
-        if "." in task_id:
+        if not task._is_main_task:
             # 子任务，从父任务的子任务列表中删除
             parent_id = task_id.split(".")[0]
             parent_task = self.tasks.get(parent_id)
             
-            if parent_task and hasattr(parent_task, 'subtasks') and isinstance(parent_task.subtasks, list):
-                # 从父任务的子任务列表中删除
-                parent_task.subtasks = [
+            if parent_task:
+                # 从父任务的子任务列表中删除（原地修改，保持列表对象不变）
+                parent_task.subtasks[:] = [
                     subtask for subtask in parent_task.subtasks 
-                    if not isinstance(subtask, Task) or subtask.id != task_id
+                    if subtask.id != task_id
                 ]
         else:
             # 主任务，直接从字典中删除
             if task_id in self.tasks:
                 del self.tasks[task_id]
         
-        # 从依赖图中删除
-        if task_id in self.dependency_graph:
-            del self.dependency_graph[task_id]
-        
-        # 保存到文件
-        self._save_tasks_to_file()
+        # 安排延迟写入，多次变更合并为一次文件写入
+        self._schedule_flush()
         
         return True
     
@@ -477,46 +819,57 @@ class TaskStorage:
         tag: Optional[str] = None,
         assigned_to: Optional[str] = None,
         page: int = 1,
-        page_size: int = 100
+        page_size: int = 100,
+        order_by: str = 'id'
     ) -> Tuple[List[Task], int]:
-        """列出任务，支持筛选和分页"""
-        # 收集所有任务（主任务和子任务）
-        all_tasks = []
-        
-        # 添加主任务
-        for task in self.tasks.values():
-            all_tasks.append(task)
-            
-            # 添加子任务
-            if hasattr(task, 'subtasks') and isinstance(task.subtasks, list):
-                all_tasks.extend([
-                    subtask for subtask in task.subtasks 
-                    if isinstance(subtask, Task)
-                ])
-        
-        # 应用筛选
-        filtered_tasks = all_tasks
+        """列出任务，支持筛选和分页
         
+        Args:
+            order_by: 排序字段名，默认按ID排序
+        """
+        # 使用二级索引求出候选任务ID集合（从最小的集合开始求交集）
+        candidate_sets = []
         if status:
-            filtered_tasks = [t for t in filtered_tasks if t.status == status]
+            candidate_sets.append(self._by_status.get(TaskStatus(status), set()))
         if priority:
-            filtered_tasks = [t for t in filtered_tasks if t.priority == priority]
+            candidate_sets.append(self._by_priority.get(TaskPriority(priority), set()))
         if tag:
-            filtered_tasks = [t for t in filtered_tasks if tag in t.tags]
+            candidate_sets.append(self._by_tag.get(tag, set()))
         if assigned_to:
-            filtered_tasks = [t for t in filtered_tasks if t.assigned_to == assigned_to]
+            candidate_sets.append(self._by_assignee.get(assigned_to, set()))
+        
+        start = (page - 1) * page_size
+        end = start + page_size
+        
+        if candidate_sets:
+            candidate_sets.sort(key=len)
+            candidate_ids = candidate_sets[0].intersection(*candidate_sets[1:])
+            if order_by == 'id':
+                # 按ID排序时直接对候选ID排序，只取出当前页的任务
+                if end * 4 < len(candidate_ids):
+                    page_ids = heapq.nsmallest(end, candidate_ids)[start:]
+                else:
+                    page_ids = sorted(candidate_ids)[start:end]
+                return [self.get_task(task_id) for task_id in page_ids], len(candidate_ids)
+            filtered_tasks = [self.get_task(task_id) for task_id in candidate_ids]
+        elif order_by == 'id':
+            # 没有筛选条件且按ID排序时，直接在有序ID列表上切片，只取出当前页的任务
+            if self._sorted_ids is None:
+                self._sorted_ids = sorted(self._indexed)
+            return [self.get_task(task_id) for task_id in self._sorted_ids[start:end]], len(self._sorted_ids)
+        else:
+            # 没有筛选条件时，返回所有任务（主任务和子任务）
+            filtered_tasks = list(self._iter_all_tasks())
         
         # 计算总数
         total = len(filtered_tasks)
         
-        # 应用分页
-        start = (page - 1) * page_size
-        end = start + page_size
-        paged_tasks = sorted(
-            filtered_tasks, 
-            key=lambda t: (t.id),
-            reverse=False
-        )[start:end]
+        # 应用分页：只需要前几页时用堆选出前 end 个，避免完整排序
+        sort_key = attrgetter(order_by)
+        if end * 4 < total:
+            paged_tasks = heapq.nsmallest(end, filtered_tasks, key=sort_key)[start:]
+        else:
+            paged_tasks = sorted(filtered_tasks, key=sort_key)[start:end]
         
         return paged_tasks, total
     
@@ -534,25 +887,29 @@ class TaskStorage:
         if task_id == depends_on_id:
             return False, "Task cannot depend on itself"
         
-        # 检测循环依赖
-        if self._would_create_cycle(task_id, depends_on_id):
+        # 检测循环依赖（被依赖任务自身没有依赖时不可能形成循环，无需遍历）
+        if not depends_on_task.dependencies:
+            pass
+        elif self._would_create_cycle(task_id, depends_on_id):
             return False, "This would create a circular dependency"
         
         # 添加依赖关系
         task.add_dependency(depends_on_id)
         task.add_blocked_by(depends_on_id)
+        self._forget_transitive_deps(task_id)
         
         # 更新依赖图
-        if depends_on_id not in self.dependency_graph:
-            self.dependency_graph[depends_on_id] = set()
         self.dependency_graph[depends_on_id].add(task_id)
+        self._dependents_changed(depends_on_id)
         
         # 如果被依赖任务已完成，移除阻塞
         if depends_on_task.status == TaskStatus.DONE:
             task.remove_blocked_by(depends_on_id)
         
-        # 保存到文件
-        self._save_tasks_to_file()
+        self._reindex_task(task)
+        
+        # 安排延迟写入，多次变更合并为一次文件写入
+        self._schedule_flush()
         
         return True, None
     
@@ -569,16 +926,97 @@ class TaskStorage:
         # 移除依赖关系
         task.remove_dependency(depends_on_id)
         task.remove_blocked_by(depends_on_id)
+        self._forget_transitive_deps(task_id)
         
         # 更新依赖图
         if depends_on_id in self.dependency_graph:
             self.dependency_graph[depends_on_id].discard(task_id)
+            self._dependents_changed(depends_on_id)
         
-        # 保存到文件
-        self._save_tasks_to_file()
+        self._reindex_task(task)
+        
+        # 安排延迟写入，多次变更合并为一次文件写入
+        self._schedule_flush()
         
         return True
     
+    def bulk_add_dependencies(self, edges: Iterable[Tuple[str, str]]) -> Tuple[bool, Optional[str]]:
+        """批量添加依赖关系，整批依赖只做一次循环检测
+        
+        逐条调用 set_task_dependency 时每条依赖都要单独检测循环；这里先收集整批依赖，
+        再对加入后的依赖图做一次 Kahn 拓扑排序。任意一条依赖不合法或会形成循环时，
+        整批依赖都不会写入。
+        
+        Args:
+            edges: (task_id, depends_on_id) 元组序列，表示 task_id 依赖 depends_on_id
+            
+        Returns:
+            Tuple[bool, Optional[str]]: (是否成功, 失败原因)
+        """
+        # 收集并校验新增的依赖（已存在的依赖直接跳过）
+        new_deps: Dict[str, Set[str]] = defaultdict(set)
+        for task_id, depends_on_id in edges:
+            task = self.get_task(task_id)
+            if not task or not self.get_task(depends_on_id):
+                return False, f"One or both tasks do not exist: {task_id}, {depends_on_id}"
+            if task_id == depends_on_id:
+                return False, f"Task cannot depend on itself: {task_id}"
+            if depends_on_id not in task.dependencies:
+                new_deps[task_id].add(depends_on_id)
+        
+        if not new_deps:
+            return True, None
+        
+        def deps_of(current_id: str) -> Set[str]:
+            current_task = self.get_task(current_id)
+            if not current_task:
+                return set()
+            return current_task.dependencies | new_deps.get(current_id, set())
+        
+        # 新的循环必然经过某条新增依赖的起点，只需检查从这些任务出发能到达的子图
+        adjacency: Dict[str, Set[str]] = {}
+        queue = deque(new_deps)
+        while queue:
+            current = queue.popleft()
+            if current in adjacency:
+                continue
+            adjacency[current] = deps_of(current)
+            queue.extend(dep_id for dep_id in adjacency[current] if dep_id not in adjacency)
+        
+        # Kahn 拓扑排序：无法全部出队说明子图中存在循环
+        in_degree = dict.fromkeys(adjacency, 0)
+        for deps in adjacency.values():
+            for dep_id in deps:
+                in_degree[dep_id] += 1
+        ready = deque(node for node, degree in in_degree.items() if degree == 0)
+        drained = 0
+        while ready:
+            node = ready.popleft()
+            drained += 1
+            for dep_id in adjacency[node]:
+                in_degree[dep_id] -= 1
+                if in_degree[dep_id] == 0:
+                    ready.append(dep_id)
+        if drained < len(adjacency):
+            return False, "This would create a circular dependency"
+        
+        # 检测通过后一次性写入所有依赖
+        for task_id, depends_on_ids in new_deps.items():
+            task = self.get_task(task_id)
+            for depends_on_id in depends_on_ids:
+                task.add_dependency(depends_on_id)
+                if self.get_task(depends_on_id).status != TaskStatus.DONE:
+                    task.add_blocked_by(depends_on_id)
+                self.dependency_graph[depends_on_id].add(task_id)
+                self._dependents_changed(depends_on_id)
+            self._forget_transitive_deps(task_id)
+            self._reindex_task(task)
+        
+        # 安排延迟写入，多次变更合并为一次文件写入
+        self._schedule_flush()
+        
+        return True, None
+    
     def get_next_executable_tasks(self, limit: int = 5) -> List[Task]:
         """获取下一批可执行的任务
         
@@ -596,28 +1034,11 @@ class TaskStorage:
         # 结果任务列表
         final_tasks = []
         
-        # 找出所有没有被阻塞的主任务（不包括子任务）
-        executable_parent_tasks = [
-            task for task in self.tasks.values()
-            if (task.status == TaskStatus.TODO or task.status == TaskStatus.IN_PROGRESS) and 
-            len(task.blocked_by) == 0 and 
-            "." not in task.id
-        ]
-        
-        # 按优先级、依赖关系和创建时间排序主任务
-        sorted_parent_tasks = sorted(
-            executable_parent_tasks,
-            key=lambda t: (
-                # 状态优先级：in_progress优先于todo
-                0 if t.status == TaskStatus.IN_PROGRESS else 1,
-                # 优先级从高到低
-                {"critical": 0, "high": 1, "medium": 2, "low": 3}.get(t.priority, 4),
-                # 依赖该任务的任务数量（越多越优先）
-                -len(self.dependency_graph.get(t.id, set())),
-                # 创建时间（越早创建越优先）
-                t.created_at
-            )
-        )
+        # 主任务排序结果在状态、优先级或依赖关系变化前保持不变，直接复用缓存
+        if self._exec_ranking is None or self._exec_ranking_limit < limit:
+            self._exec_ranking = self._rank_executable_parents(limit)
+            self._exec_ranking_limit = limit
+        sorted_parent_tasks = self._exec_ranking
         
         # 如果没有可执行的主任务，返回空列表
         if not sorted_parent_tasks:
@@ -627,107 +1048,128 @@ class TaskStorage:
         top_parent_task = sorted_parent_tasks[0]
         logger.info(f"最优先的主任务是: {top_parent_task.id} ({top_parent_task.name}), 优先级: {top_parent_task.priority}")
         
-        # 检查主任务是否有子任务
-        subtasks = getattr(top_parent_task, 'subtasks', None)
+        # 检查主任务是否有子任务（subtasks 总是 Task 列表，可能为空）
+        subtasks = top_parent_task.subtasks
         has_executable_subtasks = False
         
-        if subtasks and isinstance(subtasks, list) and len(subtasks) > 0:
+        # 循环中反复用到的状态值
+        todo, in_progress, done = TaskStatus.TODO, TaskStatus.IN_PROGRESS, TaskStatus.DONE
+        
+        if subtasks:
             logger.info(f"主任务 {top_parent_task.id} 有 {len(subtasks)} 个子任务")
             
-            # 第一步：找出所有子任务的ID、状态和阻塞列表
-            subtask_obj_map = {}
-            for subtask in subtasks:
-                if isinstance(subtask, Task):
-                    subtask_obj_map[subtask.id] = subtask
-                    logger.info(f"  检查子任务 {subtask.id} ({subtask.name}), 状态: {subtask.status}, 阻塞: {subtask.blocked_by}")
-            
             # 当前主任务的可执行子任务
             executable_subtasks = []
             
-            # 第二步：检查每个子任务是否可执行
-            for subtask_id, subtask_obj in subtask_obj_map.items():
+            # 检查每个子任务是否可执行
+            for subtask in subtasks:
+                logger.info(f"  检查子任务 {subtask.id} ({subtask.name}), 状态: {subtask.status}, 阻塞: {subtask.blocked_by}")
+                
                 # 子任务必须状态为todo或in_progress且没有被阻塞
-                if (subtask_obj.status == TaskStatus.TODO or subtask_obj.status == TaskStatus.IN_PROGRESS) and \
-                   len(subtask_obj.blocked_by) == 0:
-                    logger.info(f"  子任务 {subtask_id} 可执行 (状态: {subtask_obj.status}, 无阻塞)")
-                    executable_subtasks.append(subtask_obj)
-                elif (subtask_obj.status == TaskStatus.TODO or subtask_obj.status == TaskStatus.IN_PROGRESS):
-                    logger.info(f"  子任务 {subtask_id} 不可执行 (状态: {subtask_obj.status}, 被阻塞: {subtask_obj.blocked_by})")
-            
-            # 构建子任务ID到依赖数量的映射 (用于排序)
-            subtask_dependencies = {}
-            for subtask in executable_subtasks:
-                dep_count = len(subtask.dependencies)
-                subtask_dependencies[subtask.id] = dep_count
+                status = subtask.status
+                if status != todo and status != in_progress:
+                    continue
+                if not subtask.blocked_by:
+                    logger.info(f"  子任务 {subtask.id} 可执行 (状态: {status}, 无阻塞)")
+                    executable_subtasks.append(subtask)
+                else:
+                    logger.info(f"  子任务 {subtask.id} 不可执行 (状态: {status}, 被阻塞: {subtask.blocked_by})")
             
             # 如果找到了可执行的子任务
             if executable_subtasks:
                 has_executable_subtasks = True
                 
-                # 按状态、优先级、依赖数量和创建时间排序子任务
-                sorted_executable_subtasks = sorted(
-                    executable_subtasks,
-                    key=lambda t: (
-                        # 状态优先级：in_progress优先于todo
-                        0 if t.status == TaskStatus.IN_PROGRESS else 1,
-                        # 优先级从高到低
-                        {"critical": 0, "high": 1, "medium": 2, "low": 3}.get(t.priority, 4),
-                        # 依赖任务的数量（越少越优先）
-                        subtask_dependencies.get(t.id, 0),
-                        # 创建时间（越早创建越优先）
-                        t.created_at
-                    )
+                # 按状态、优先级、依赖数量（越少越优先）和创建时间排序子任务
+                sorted_executable_subtasks = self._sort_by_priority(
+                    executable_subtasks, lambda t: len(t.dependencies), limit - len(final_tasks)
                 )
                 
                 # 将排序后的子任务添加到结果列表
-                for st in sorted_executable_subtasks[:limit]:
-                    logger.info(f"选中可执行子任务: {st.id} ({st.name}), 优先级: {st.priority}, 依赖数量: {subtask_dependencies.get(st.id, 0)}")
+                for st in sorted_executable_subtasks:
+                    logger.info(f"选中可执行子任务: {st.id} ({st.name}), 优先级: {st.priority}, 依赖数量: {len(st.dependencies)}")
                     final_tasks.append(st)
         
-        # 如果主任务没有可执行的子任务
-        if not has_executable_subtasks:
-            # 检查主任务是否有子任务且是否全部完成
-            all_subtasks_done = True
-            if subtasks and isinstance(subtasks, list) and len(subtasks) > 0:
-                for subtask in subtasks:
-                    if isinstance(subtask, Task) and subtask.status != TaskStatus.DONE:
-                        all_subtasks_done = False
-                        break
-            
-            # 如果没有子任务或所有子任务都完成，则主任务可执行
-            if not subtasks or len(subtasks) == 0 or all_subtasks_done:
-                logger.info(f"主任务 {top_parent_task.id} 可执行 (没有子任务或所有子任务已完成)")
-                final_tasks.append(top_parent_task)
+        # 如果主任务没有可执行的子任务，且没有子任务或所有子任务都完成，则主任务可执行
+        if not has_executable_subtasks and all(subtask.status == done for subtask in subtasks):
+            logger.info(f"主任务 {top_parent_task.id} 可执行 (没有子任务或所有子任务已完成)")
+            final_tasks.append(top_parent_task)
         
         # 返回限制数量的任务
         return final_tasks[:limit]
     
+    def _rank_executable_parents(self, limit: int) -> List[Task]:
+        """找出所有可执行的主任务，按状态、优先级、依赖关系和创建时间排序后返回前 limit 个"""
+        # 可执行主任务集合随索引增量维护，无需再求状态与阻塞集合的交集
+        executable_parent_tasks = (self.tasks[task_id] for task_id in self._ready_parents)
+        
+        # 按状态、优先级、依赖关系（依赖该任务的任务越多越优先）和创建时间排序主任务
+        dependency_graph = self.dependency_graph
+        return self._sort_by_priority(
+            executable_parent_tasks, lambda t: -len(dependency_graph.get(t.id, ())), limit
+        )
+    
+    @staticmethod
+    def _sort_by_priority(tasks: Iterable[Task], weight: Callable[[Task], int], limit: int) -> List[Task]:
+        """按状态、优先级、权重和创建时间对任务排序，只返回最优先的 limit 个
+        
+        Args:
+            tasks: 待排序的任务（可以是生成器）
+            weight: 计算任务排序权重的函数（值越小越优先）
+            limit: 返回任务数量限制（使用堆选取，无需完整排序）
+        """
+        return heapq.nsmallest(
+            limit,
+            tasks,
+            key=lambda t: (
+                # 状态优先级：in_progress优先于todo
+                t._status_rank,
+                # 优先级从高到低
+                t._prio_rank,
+                # 调用方给出的排序权重
+                weight(t),
+                # 创建时间（越早创建越优先）
+                t.created_at
+            )
+        )
+    
     def _would_create_cycle(self, task_id: str, depends_on_id: str) -> bool:
-        """检测添加依赖是否会导致循环依赖"""
-        # 如果被依赖的任务已经直接或间接依赖于当前任务，则会形成循环
-        visited = set()
-        queue = [depends_on_id]
+        """检测添加依赖是否会导致循环依赖
+        
+        当且仅当 task_id 可以沿依赖关系从 depends_on_id 到达时会形成循环，
+        即 task_id 位于 depends_on_id 的传递依赖集合中。
+        """
+        return task_id in self._get_transitive_deps(depends_on_id)
+    
+    def _get_transitive_deps(self, task_id: str) -> Set[str]:
+        """获取任务直接和间接依赖的所有任务ID（结果会被缓存）
+        
+        批量添加依赖时会对同一批任务反复做循环检测，缓存使重复检测只需一次集合查找；
+        遍历中遇到已缓存的任务直接合并其结果，不再展开。
+        """
+        cached = self._transitive_deps.get(task_id)
+        if cached is not None:
+            return cached
+        
+        result: Set[str] = set()
+        queue = deque((task_id,))
         
         while queue:
-            current = queue.pop(0)
-            if current == task_id:
-                return True
-            
-            if current in visited:
-                continue
-                
-            visited.add(current)
-            
-            # 获取当前任务对象
-            current_task = self.get_task(current)
+            current_task = self.get_task(queue.popleft())
             if not current_task:
                 continue
-                
-            # 添加当前任务的依赖到队列
-            dependencies = current_task.dependencies
-            queue.extend([dep for dep in dependencies if dep not in visited])
+            
+            for dep_id in current_task.dependencies:
+                if dep_id in result:
+                    continue
+                result.add(dep_id)
+                known = self._transitive_deps.get(dep_id)
+                if known is not None:
+                    result |= known
+                else:
+                    queue.append(dep_id)
         
-        return False
+        self._transitive_deps[task_id] = result
+        return result
     
     def _unblock_dependents(self, task_id: str) -> None:
         """解除依赖于给定任务ID的所有任务的阻塞状态"""
@@ -741,6 +1183,7 @@ class TaskStorage:
             if blocked_task:
                 logger.info(f"  - 正在从任务 {blocked_id} 的 blocked_by 列表中移除 {task_id}")
                 blocked_task.remove_blocked_by(task_id)
+                self._reindex_task(blocked_task)
                 logger.info(f"  - 任务 {blocked_id} 的 blocked_by 列表更新为: {blocked_task.blocked_by}")
             else:
                 logger.warning(f"  - 未找到任务 {blocked_id}，无法解除阻塞")
@@ -753,42 +1196,84 @@ class TaskStorage:
         
         original_status = task.status # 记录原始状态
         task.mark_as_done()
+        self._reindex_task(task)
         
         # --- 调用新的解除阻塞方法 ---
         if original_status != TaskStatus.DONE: # 仅当状态确实改变为DONE时才解除阻塞
             self._unblock_dependents(task_id)
         
-        # 保存到文件
-        self._save_tasks_to_file()
+        # 安排延迟写入，多次变更合并为一次文件写入
+        self._schedule_flush()
         
         return True
     
     def count_tasks_by_status(self) -> Dict[str, int]:
-        """统计各状态任务数量"""
-        counts = {status.value: 0 for status in TaskStatus}
-        
-        # 统计主任务状态
-        for task in self.tasks.values():
-            counts[task.status] += 1
-            
-            # 统计子任务状态
-            if hasattr(task, 'subtasks') and isinstance(task.subtasks, list):
-                for subtask in task.subtasks:
-                    if isinstance(subtask, Task):
-                        counts[subtask.status] += 1
-            
-        return counts
+        """统计各状态任务数量（直接读取状态索引的大小）"""
+        return {status.value: len(task_ids) for status, task_ids in self._by_status.items()}
 
     def clear_all_tasks(self) -> None:
         """清空所有任务和依赖关系"""
         self.tasks.clear()
         self.dependency_graph.clear()
+        self._subtask_index.clear()
+        self._clear_indexes()
         
         # 同时清空文件
         try:
+            self._dirty = False
+            self._pending_ops = 0
             if os.path.exists(self.master_file_path):
-                with open(self.master_file_path, 'w', encoding='utf-8') as f:
-                    json.dump([], f)
+                if self._format == 'msgpack':
+                    with open(self.master_file_path, 'wb') as f:
+                        f.write(msgpack.packb([], use_bin_type=True))
+                else:
+                    with open(self.master_file_path, 'w', encoding='utf-8') as f:
+                        json.dump([], f)
             logger.info("所有任务和依赖关系已被清空，文件已重置")
         except Exception as e:
             logger.error(f"清空任务文件失败: {str(e)}")
+
+
+def read_task_file(path: str) -> Any:
+    """一次性读取并解析任务文件（.msgpack 文件按 msgpack 解析，其余按 JSON 解析）
+    
+    Args:
+        path: 任务文件路径
+        
+    Returns:
+        Any: 文件内容（主任务字典列表）
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    if path.endswith('.msgpack'):
+        if msgpack is None:
+            raise ImportError("msgpack is required to read msgpack task files")
+        return msgpack.unpackb(content, raw=False)
+    return orjson.loads(content) if orjson is not None else json.loads(content)
+
+
+def migrate_json_to_msgpack(tasks_dir: str) -> str:
+    """将任务目录中的 all_tasks.json 一次性转换为 all_tasks.msgpack
+    
+    Args:
+        tasks_dir: 任务文件所在目录
+        
+    Returns:
+        str: 生成的 msgpack 文件路径
+    """
+    if msgpack is None:
+        raise ImportError("msgpack is required to migrate task storage to msgpack format")
+    
+    json_path = os.path.join(tasks_dir, "all_tasks.json")
+    msgpack_path = os.path.join(tasks_dir, "all_tasks.msgpack")
+    
+    data = read_task_file(json_path)
+    
+    # 写入临时文件后原子替换，避免留下残缺文件
+    tmp_path = msgpack_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(msgpack.packb(data, use_bin_type=True))
+    os.replace(tmp_path, msgpack_path)
+    
+    logger.info(f"已将任务文件 {json_path} 转换为 {msgpack_path}")
+    return msgpack_path
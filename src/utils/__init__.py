@@ -24,4 +24,7 @@ from .logging_config import (
 )
 
 # 导出依赖检查工具
-from .dependency_checker import DependencyChecker 
\ No newline at end of file
+from .dependency_checker import DependencyChecker 
+
+# 导出 LLM 批量调用工具
+from .llm_bulk import run_many, run_with_checkpoint
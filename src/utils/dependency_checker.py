@@ -4,7 +4,8 @@
 提供检查任务依赖关系的功能，包括循环依赖检测
 """
 
-from typing import Dict, List, Set
+from collections import deque
+from typing import Dict, FrozenSet, List, Set
 
 
 class DependencyChecker:
@@ -24,20 +25,18 @@ class DependencyChecker:
             bool: 如果添加依赖会导致循环，返回True，否则返回False
         """
         # 如果被依赖的节点已经直接或间接依赖于起始节点，则会形成循环
-        visited = set()
-        queue = [end_node]
+        visited = {end_node}
+        queue = deque((end_node,))
         
         while queue:
-            current = queue.pop(0)
+            current = queue.popleft()
             if current == start_node:
                 return True
             
-            if current in visited:
-                continue
-                
-            visited.add(current)
-            if current in graph:
-                queue.extend([dep for dep in graph[current] if dep not in visited])
+            for dep in graph.get(current, ()):
+                if dep not in visited:
+                    visited.add(dep)
+                    queue.append(dep)
         
         return False
     
@@ -53,27 +52,32 @@ class DependencyChecker:
             List[List[str]]: 包含所有循环的列表
         """
         result = []
+        # 已找到循环的节点集合，用于 O(1) 去重
+        seen_cycles: Set[FrozenSet[str]] = set()
+        # 当前搜索路径上的节点集合（与 path 同步增删）
         visited = set()
         
         def dfs(node: str, path: List[str], start_node: str) -> None:
-            """深度优先搜索查找循环"""
-            if node in path:
+            """深度优先搜索查找循环（共享同一个 path，返回前回溯）"""
+            if node in visited:
                 # 找到循环
                 cycle_start_index = path.index(node)
                 cycle = path[cycle_start_index:] + [node]
-                if set(cycle) not in [set(c) for c in result]:
+                key = frozenset(cycle)
+                if key not in seen_cycles:
+                    seen_cycles.add(key)
                     result.append(cycle)
                 return
             
             path.append(node)
             visited.add(node)
             
-            if node in graph:
-                for neighbor in graph[node]:
-                    if neighbor not in visited or neighbor == start_node:
-                        dfs(neighbor, path[:], start_node)
+            for neighbor in graph.get(node, ()):
+                if neighbor not in visited or neighbor == start_node:
+                    dfs(neighbor, path, start_node)
             
             visited.remove(node)
+            path.pop()
         
         # 对每个节点进行DFS
         for node in graph:
@@ -95,25 +99,28 @@ class DependencyChecker:
             List[List[str]]: 包含所有依赖链的列表
         """
         result = []
+        # 当前路径上除末端节点外的节点集合
         visited = set()
         
         def dfs(node: str, path: List[str]) -> None:
-            """深度优先搜索查找依赖链"""
+            """深度优先搜索查找依赖链（共享同一个 path，返回前回溯）"""
             path.append(node)
+            deps = graph.get(node)
             
             # 如果是叶子节点（没有依赖）或所有依赖都已访问
-            if node not in graph or not graph[node] or all(dep in visited for dep in graph[node]):
+            if not deps or all(dep in visited for dep in deps):
                 result.append(path[:])
+                path.pop()
                 return
             
             visited.add(node)
             
-            if node in graph:
-                for dep in graph[node]:
-                    if dep not in path:  # 避免循环
-                        dfs(dep, path[:])
+            for dep in deps:
+                if dep not in visited:  # 避免循环
+                    dfs(dep, path)
             
             visited.remove(node)
+            path.pop()
         
         dfs(start_node, [])
         return result
@@ -130,18 +137,5 @@ class DependencyChecker:
         Returns:
             Set[str]: 被阻塞的任务ID集合
         """
-        blocked_tasks = set()
-        
-        # 对于每个已完成的任务，移除它对其他任务的阻塞
-        for done_task in done_tasks:
-            if done_task in graph:
-                # 该任务已完成，不再阻塞其他任务
-                for blocked in graph[done_task]:
-                    blocked_tasks.discard(blocked)
-        
-        # 对于每个未完成的任务，它阻塞依赖它的任务
-        for node, blocked in graph.items():
-            if node not in done_tasks:
-                blocked_tasks.update(blocked)
-        
-        return blocked_tasks 
\ No newline at end of file
+        # 未完成的任务阻塞所有依赖它的任务；已完成任务不阻塞任何任务
+        return set().union(*(blocked for node, blocked in graph.items() if node not in done_tasks))
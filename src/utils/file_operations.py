@@ -9,8 +9,35 @@ import os
 import json
 from typing import Dict, Any, Optional, List
 
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时使用标准库 json
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+def _dump_json_bytes(obj: Any) -> bytes:
+    """将对象序列化为带缩进的 UTF-8 JSON 字节（优先使用 orjson）"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+def _write_file_atomic(file_path: str, content: bytes, durable: bool = False) -> None:
+    """一次性写入临时文件后原子替换目标文件，避免中途失败留下残缺文件
+    
+    Args:
+        file_path: 目标文件路径
+        content: 要写入的字节内容
+        durable: 是否在替换前 fsync 到磁盘
+    """
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
 def save_task_to_json(task_dict: Dict[str, Any], tasks_dir: str) -> Optional[str]:
     """将任务保存到JSON文件
     
@@ -30,21 +57,23 @@ def save_task_to_json(task_dict: Dict[str, Any], tasks_dir: str) -> Optional[str
     file_path = os.path.join(tasks_dir, filename)
     
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(task_dict, f, ensure_ascii=False, indent=2)
-        logger.debug(f"任务已保存到文件: {file_path}")
+        _write_file_atomic(file_path, _dump_json_bytes(task_dict))
+        logger.debug("任务已保存到文件: %s", file_path)
         return file_path
     except Exception as e:
         logger.error(f"保存任务到JSON文件失败: {str(e)}")
         return None
 
-def save_tasks_to_json(tasks: List[Dict[str, Any]], tasks_dir: str, filename_prefix: str) -> Optional[str]:
+def save_tasks_to_json(
+    tasks: List[Dict[str, Any]], tasks_dir: str, filename_prefix: str, durable: bool = False
+) -> Optional[str]:
     """将任务列表保存到JSON文件
     
     Args:
         tasks: 任务列表
         tasks_dir: 保存任务文件的目录路径
         filename_prefix: 文件名前缀
+        durable: 是否在写入后 fsync 到磁盘
         
     Returns:
         Optional[str]: 保存成功返回文件路径，失败返回None
@@ -59,9 +88,8 @@ def save_tasks_to_json(tasks: List[Dict[str, Any]], tasks_dir: str, filename_pre
     file_path = os.path.join(tasks_dir, filename)
     
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(tasks, f, ensure_ascii=False, indent=2)
-        logger.debug(f"任务列表已保存到文件: {file_path}")
+        _write_file_atomic(file_path, _dump_json_bytes(tasks), durable)
+        logger.debug("任务列表已保存到文件: %s", file_path)
         return file_path
     except Exception as e:
         logger.error(f"保存任务列表到JSON文件失败: {str(e)}")
@@ -79,13 +107,16 @@ def clear_directory(directory_path: str) -> None:
             return
 
         file_count = 0
-        for filename in os.listdir(directory_path):
-            file_path = os.path.join(directory_path, filename)
-            # 只删除文件，不删除子目录
-            if os.path.isfile(file_path):
-                os.remove(file_path)
-                file_count += 1
-                logger.debug(f"已删除文件: {file_path}")
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        # scandir 的目录项自带文件类型信息，无需逐个 stat
+        with os.scandir(directory_path) as entries:
+            for entry in entries:
+                # 只删除文件，不删除子目录
+                if entry.is_file():
+                    os.remove(entry.path)
+                    file_count += 1
+                    if debug_enabled:
+                        logger.debug("已删除文件: %s", entry.path)
         
         logger.info(f"已清空目录 {directory_path}，共删除 {file_count} 个文件")
     except Exception as e:
@@ -0,0 +1,166 @@
+"""
+LLM 批量调用工具函数
+
+提供并发受限、按每分钟请求数（QPM）匀速发送的批量 LLM 调用，
+遇到限流错误时按指数退避重试；并支持把结果逐条写入检查点文件，中断后从断点继续
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+def _is_rate_limited(error: Optional[BaseException]) -> bool:
+    """判断异常（或引发它的原始异常）是否为限流错误（HTTP 429）"""
+    while error is not None:
+        if getattr(error, 'status_code', None) == 429 or getattr(error, 'code', None) == 429:
+            return True
+        if type(error).__name__ in ('RateLimitError', 'ResourceExhausted'):
+            return True
+        error = error.__cause__
+    return False
+
+async def run_many(
+    llm: Any,
+    prompts: Sequence[str],
+    qpm: int = 500,
+    max_concurrency: int = 50,
+    max_retries: int = 3,
+    retry_base_delay: float = 1.0,
+    return_exceptions: bool = False,
+    on_result: Optional[Callable[[int, Any], None]] = None,
+    **kwargs: Any
+) -> List[Any]:
+    """并发地对多个提示词调用 llm.generate_text_async，结果顺序与 prompts 一致
+
+    Args:
+        llm: LLM 客户端（LLMInterface 实例）
+        prompts: 提示词列表
+        qpm: 每分钟最多发出的请求数，请求按固定间隔匀速发出
+        max_concurrency: 同时进行中的请求数上限
+        max_retries: 遇到限流错误时的最大重试次数
+        retry_base_delay: 第一次重试前的等待秒数，之后每次翻倍
+        return_exceptions: 为 True 时失败的调用在结果中返回异常对象，否则抛出第一个异常并取消其余调用
+        on_result: 每个调用成功后立即调用的回调，参数为提示词下标和生成结果
+        **kwargs: 传给 generate_text_async 的其他参数
+
+    Returns:
+        List[Any]: 每个提示词对应的生成结果
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    interval = 60.0 / qpm
+    # 下一个可用的发送时间点；预约时间点时不会让出事件循环，因此无需加锁
+    next_slot = loop.time()
+
+    async def _wait_for_slot() -> None:
+        nonlocal next_slot
+        now = loop.time()
+        slot = max(now, next_slot)
+        next_slot = slot + interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _run_one(index: int, prompt: str) -> Any:
+        async with semaphore:
+            for attempt in range(max_retries + 1):
+                await _wait_for_slot()
+                try:
+                    result = await llm.generate_text_async(prompt, **kwargs)
+                except Exception as e:
+                    if attempt == max_retries or not _is_rate_limited(e):
+                        raise
+                    delay = retry_base_delay * (2 ** attempt)
+                    logger.warning(f"第 {index} 个请求被限流，{delay:.1f} 秒后重试 ({attempt + 1}/{max_retries})")
+                    await asyncio.sleep(delay)
+                    continue
+                if on_result is not None:
+                    on_result(index, result)
+                return result
+
+    tasks = [asyncio.ensure_future(_run_one(index, prompt)) for index, prompt in enumerate(prompts)]
+    try:
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+    finally:
+        # 某个调用失败（或调用方被取消）时取消其余仍在进行的调用，并等待它们结束，
+        # 保证返回后不会再有调用或 on_result 回调在后台执行
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def _prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+def _load_checkpoint(out_path: str) -> Dict[str, Any]:
+    """读取检查点文件，返回 提示词哈希 -> 生成结果（忽略中断时写了一半的行）"""
+    done: Dict[str, Any] = {}
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                done[entry['hash']] = entry['response']
+            except (ValueError, KeyError, TypeError):
+                continue
+    return done
+
+def _ends_with_newline(path: str) -> bool:
+    """判断文件是否为空或以换行符结尾"""
+    with open(path, 'rb') as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+async def run_with_checkpoint(
+    llm: Any,
+    prompts: Sequence[str],
+    out_path: str,
+    **kwargs: Any
+) -> List[Any]:
+    """批量调用 LLM，并把每个结果立即追加到 JSONL 检查点文件
+
+    再次运行时跳过检查点中已有结果的提示词（按提示词的 SHA-256 匹配），
+    只调用剩余部分，中途崩溃不会浪费已完成的调用。
+
+    Args:
+        llm: LLM 客户端（LLMInterface 实例）
+        prompts: 提示词列表
+        out_path: JSONL 检查点文件路径，每行为 {"hash", "prompt", "response"}
+        **kwargs: 传给 run_many 的其他参数（qpm、max_concurrency 等）
+
+    Returns:
+        List[Any]: 每个提示词对应的生成结果，顺序与 prompts 一致；
+            传入 return_exceptions=True 时失败的提示词对应异常对象（不写入检查点，下次运行时重试）
+    """
+    done = _load_checkpoint(out_path)
+    pending = list(dict.fromkeys(prompt for prompt in prompts if _prompt_hash(prompt) not in done))
+    if len(done) and pending:
+        logger.info(f"从检查点 {out_path} 恢复：已完成 {len(done)} 个，剩余 {len(pending)} 个")
+    
+    if pending:
+        with open(out_path, 'a', encoding='utf-8') as f:
+            if not _ends_with_newline(out_path):
+                # 上次中断时留下了写了一半的行，换行后再追加
+                f.write("\n")
+            
+            def _record(index: int, response: Any) -> None:
+                # 回调在事件循环线程中同步执行，写入不会交错
+                prompt = pending[index]
+                prompt_hash = _prompt_hash(prompt)
+                f.write(json.dumps({"hash": prompt_hash, "prompt": prompt, "response": response}, ensure_ascii=False) + "\n")
+                f.flush()
+                done[prompt_hash] = response
+            
+            results = await run_many(llm, pending, on_result=_record, **kwargs)
+        
+        # 成功的结果已由 _record 记录，这里补上失败调用返回的异常对象
+        for prompt, result in zip(pending, results):
+            done.setdefault(_prompt_hash(prompt), result)
+    
+    return [done[_prompt_hash(prompt)] for prompt in prompts]
@@ -4,9 +4,23 @@
 提供日志配置相关的通用功能
 """
 
+import atexit
 import logging
 import os
+import queue
 from logging import FileHandler
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# 在后台线程中执行实际输出的监听器，重复调用 setup_logging 时复用其处理器
+_queue_listener: Optional[QueueListener] = None
+
+
+def _stop_queue_listener() -> None:
+    """停止后台日志线程，输出队列中剩余的日志"""
+    if _queue_listener is not None:
+        _queue_listener.stop()
+
 
 def setup_logging(log_file_path: str, log_level: int = logging.INFO) -> logging.Logger:
     """设置日志配置
@@ -18,6 +32,10 @@ def setup_logging(log_file_path: str, log_level: int = logging.INFO) -> logging.
     Returns:
         logging.Logger: 配置好的logger实例
     """
+    global _queue_listener
+    root_logger = logging.getLogger()
+    existing_handlers = set(root_logger.handlers)
+    
     # 配置基本日志
     logging.basicConfig(
         level=log_level,
@@ -37,13 +55,29 @@ def setup_logging(log_file_path: str, log_level: int = logging.INFO) -> logging.
     file_handler.setFormatter(log_formatter)
     file_handler.setLevel(log_level)
     
-    # 添加到根日志记录器
-    root_logger = logging.getLogger()
-    root_logger.addHandler(file_handler)
+    # 本函数创建的控制台和文件处理器交给后台线程执行，记录日志的线程（如事件循环）只需把记录放入队列，
+    # 不必等待时间格式化和磁盘写入；宿主程序或测试框架安装的处理器保持原样
+    handlers = [handler for handler in root_logger.handlers if handler not in existing_handlers]
+    for handler in handlers:
+        root_logger.removeHandler(handler)
+    handlers.append(file_handler)
+    
+    if _queue_listener is not None:
+        # 重复调用时沿用已安装的队列处理器，把之前的处理器一并交给新的监听器
+        _queue_listener.stop()
+        handlers = list(_queue_listener.handlers) + handlers
+        log_queue = _queue_listener.queue
+    else:
+        log_queue = queue.SimpleQueue()
+        root_logger.addHandler(QueueHandler(log_queue))
+        # 进程退出前输出队列中剩余的日志
+        atexit.register(_stop_queue_listener)
+    _queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
     
     # 返回名为__main__的logger
     logger = logging.getLogger('__main__')
-    logger.info(f"日志配置已设置，日志文件: {log_file_path}")
+    logger.info("日志配置已设置，日志文件: %s", log_file_path)
     
     return logger
 
@@ -0,0 +1,10 @@
+"""
+pytest 配置
+
+将项目根目录加入导入路径，测试中统一使用 src.* 导入
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
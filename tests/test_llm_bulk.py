@@ -0,0 +1,74 @@
+"""
+LLM 批量调用工具测试
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from src.utils.llm_bulk import run_with_checkpoint
+
+
+class FakeLLM:
+    """按提示词返回大写文本的假 LLM 客户端，failing 中的提示词会抛出异常"""
+    
+    def __init__(self, failing=(), delay=0.0):
+        self.failing = set(failing)
+        self.delay = delay
+        self.calls = []
+        self.completed = []
+    
+    async def generate_text_async(self, prompt, **kwargs):
+        self.calls.append(prompt)
+        if prompt in self.failing:
+            raise RuntimeError(f"failed: {prompt}")
+        await asyncio.sleep(self.delay)
+        self.completed.append(prompt)
+        return prompt.upper()
+
+
+def _checkpoint_prompts(path) -> list:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line)["prompt"] for line in f]
+
+
+def test_resume_skips_completed_prompts(tmp_path):
+    out_path = str(tmp_path / "checkpoint.jsonl")
+    prompts = ["a", "b", "c", "a"]
+    
+    first = FakeLLM(failing={"c"})
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_with_checkpoint(first, prompts, out_path, qpm=60_000))
+    
+    second = FakeLLM()
+    assert asyncio.run(run_with_checkpoint(second, prompts, out_path, qpm=60_000)) == ["A", "B", "C", "A"]
+    assert second.calls == ["c"]
+
+
+def test_return_exceptions_returns_error_for_failed_prompts(tmp_path):
+    out_path = str(tmp_path / "checkpoint.jsonl")
+    
+    results = asyncio.run(run_with_checkpoint(
+        FakeLLM(failing={"b"}), ["a", "b"], out_path, qpm=60_000, return_exceptions=True
+    ))
+    
+    assert results[0] == "A"
+    assert isinstance(results[1], RuntimeError)
+    assert _checkpoint_prompts(out_path) == ["a"]
+
+
+def test_failure_cancels_pending_calls(tmp_path):
+    out_path = str(tmp_path / "checkpoint.jsonl")
+    
+    llm = FakeLLM(failing={"a"}, delay=0.05)
+    
+    async def main() -> None:
+        with pytest.raises(RuntimeError):
+            await run_with_checkpoint(llm, ["a", "b", "c"], out_path, qpm=60_000)
+        # 失败后其余调用已被取消，不会在检查点文件关闭后继续写入
+        await asyncio.sleep(0.1)
+    
+    asyncio.run(main())
+    assert llm.completed == []
+    assert _checkpoint_prompts(out_path) == []
@@ -0,0 +1,38 @@
+"""
+结构化输出 schema 校验测试
+"""
+
+import pytest
+from pydantic import BaseModel
+
+from src.llm.base import SCHEMA_VALIDATION_ERRORS, resolve_schema, validate_structured_output
+
+
+class Feature(BaseModel):
+    name: str
+
+
+class Features(BaseModel):
+    features: list[Feature]
+
+
+def test_pydantic_schema_returns_model_instance():
+    schema_dict, schema_model = resolve_schema(Features)
+    
+    result = validate_structured_output({"features": [{"name": "a"}]}, schema_dict, schema_model)
+    
+    assert result == Features(features=[Feature(name="a")])
+    with pytest.raises(SCHEMA_VALIDATION_ERRORS):
+        validate_structured_output({"features": [{"title": "a"}]}, schema_dict, schema_model)
+
+
+def test_dict_schema_is_validated():
+    pytest.importorskip("jsonschema")
+    schema_dict, schema_model = resolve_schema({
+        "type": "array",
+        "items": {"type": "object", "properties": {"id": {"type": "string"}}, "required": ["id"]},
+    })
+    
+    assert validate_structured_output([{"id": "1"}], schema_dict, schema_model) == [{"id": "1"}]
+    with pytest.raises(SCHEMA_VALIDATION_ERRORS):
+        validate_structured_output([{"name": "no id"}], schema_dict, schema_model)
@@ -0,0 +1,45 @@
+"""
+日志配置测试
+"""
+
+import logging
+
+from src.utils import logging_config
+from src.utils.logging_config import setup_logging
+
+
+class RecordingHandler(logging.Handler):
+    """记录收到的日志的处理器，代表宿主程序或测试框架安装的处理器"""
+    
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+    
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_setup_logging_only_moves_its_own_handlers(tmp_path, monkeypatch):
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    monkeypatch.setattr(logging_config, "_queue_listener", None)
+    foreign = RecordingHandler()
+    root.addHandler(foreign)
+    log_path = tmp_path / "logs" / "app.log"
+    try:
+        setup_logging(str(log_path))
+        logging.getLogger("test").warning("hello %s", "world")
+        # 停止监听器，等待后台线程写完队列中的日志
+        logging_config._queue_listener.stop()
+        
+        assert foreign in root.handlers
+        assert foreign.messages[-1] == "hello world"
+        assert not any(
+            getattr(handler, "baseFilename", None) == str(log_path) for handler in root.handlers
+        )
+        assert "hello world" in log_path.read_text(encoding="utf-8")
+    finally:
+        for handler in logging_config._queue_listener.handlers:
+            handler.close()
+        root.handlers[:] = saved_handlers
+        root.setLevel(saved_level)
@@ -0,0 +1,186 @@
+"""
+任务存储二级索引测试
+
+随机执行一系列任务操作，每一步之后把索引查询结果与遍历全部任务的暴力计算结果逐一比较。
+"""
+
+import random
+from collections import Counter, deque
+
+import pytest
+
+from src.models.task import _PRIO_RANK, TaskPriority, TaskStatus
+from src.storage.task_storage import TaskStorage
+
+TAGS = ["api", "db", "ui", "infra"]
+ASSIGNEES = [None, "alice", "bob"]
+
+
+def _all_tasks(storage: TaskStorage) -> dict:
+    """任务ID -> 任务（主任务及其子任务）"""
+    return {task.id: task for task in storage._iter_all_tasks()}
+
+
+def _reachable(storage: TaskStorage, start_id: str, target_id: str) -> bool:
+    """沿依赖关系广度优先搜索，判断从 start_id 能否到达 target_id"""
+    seen = set()
+    queue = deque((start_id,))
+    while queue:
+        task = storage.get_task(queue.popleft())
+        if task is None:
+            continue
+        for dep_id in task.dependencies:
+            if dep_id == target_id:
+                return True
+            if dep_id not in seen:
+                seen.add(dep_id)
+                queue.append(dep_id)
+    return False
+
+
+def _check_indexes(storage: TaskStorage, rng: random.Random, next_top_id: int) -> None:
+    """比较各项索引查询与暴力计算的结果"""
+    tasks = _all_tasks(storage)
+
+    # 状态统计
+    expected_counts = Counter(TaskStatus(task.status).value for task in tasks.values())
+    assert storage.count_tasks_by_status() == {status.value: expected_counts[status.value] for status in TaskStatus}
+
+    # 按状态、优先级、标签、负责人筛选
+    filters = {
+        'status': rng.choice([None, *TaskStatus]),
+        'priority': rng.choice([None, *TaskPriority]),
+        'tag': rng.choice([None, *TAGS]),
+        'assigned_to': rng.choice(ASSIGNEES),
+    }
+    expected_ids = sorted(
+        task.id for task in tasks.values()
+        if (filters['status'] is None or task.status == filters['status'])
+        and (filters['priority'] is None or task.priority == filters['priority'])
+        and (filters['tag'] is None or filters['tag'] in task.tags)
+        and (filters['assigned_to'] is None or task.assigned_to == filters['assigned_to'])
+    )
+    # 默认按ID排序，一页即可容纳全部结果时也不例外
+    listed, total = storage.list_tasks(**filters, page_size=len(tasks) + 1)
+    assert [task.id for task in listed] == expected_ids
+    assert total == len(expected_ids)
+
+    # 无筛选分页（有序ID列表）
+    page, total = storage.list_tasks(page=2, page_size=5)
+    assert [task.id for task in page] == sorted(tasks)[5:10]
+    assert total == len(tasks)
+
+    # 未阻塞任务与可执行主任务
+    assert storage._unblocked == {task_id for task_id, task in tasks.items() if not task.blocked_by}
+    assert storage._ready_parents == {
+        task_id for task_id, task in storage.tasks.items()
+        if task.status in (TaskStatus.TODO, TaskStatus.IN_PROGRESS) and not task.blocked_by
+    }
+
+    # 依赖图的反向边与任务的 dependencies 一一对应
+    for task_id, task in tasks.items():
+        for dep_id in task.dependencies & tasks.keys():
+            assert task_id in storage.dependency_graph.get(dep_id, ())
+    for dep_id, dependents in storage.dependency_graph.items():
+        for task_id in dependents:
+            assert dep_id in tasks[task_id].dependencies
+
+    # 可执行主任务排序（可能复用缓存）与重新排序的结果一致
+    storage.get_next_executable_tasks(limit=5)
+
+    def rank_key(task):
+        dependents = sum(1 for other in tasks.values() if task.id in other.dependencies)
+        return (
+            0 if task.status == TaskStatus.IN_PROGRESS else 1,
+            _PRIO_RANK[task.priority],
+            -dependents,
+            task.created_at,
+        )
+
+    expected_ranking = sorted(rank_key(storage.tasks[task_id]) for task_id in storage._ready_parents)[:5]
+    assert [rank_key(task) for task in storage._exec_ranking[:5]] == expected_ranking
+
+    # 循环检测（可能复用传递依赖缓存）与直接搜索的结果一致
+    task_ids = list(tasks)
+    for _ in range(10):
+        if len(task_ids) < 2:
+            break
+        task_id, depends_on_id = rng.sample(task_ids, 2)
+        assert storage._would_create_cycle(task_id, depends_on_id) == _reachable(storage, depends_on_id, task_id)
+
+    # 顺延ID只增不减
+    assert storage.next_task_id() == str(next_top_id)
+
+
+def _random_step(storage: TaskStorage, rng: random.Random, next_top_id: int, subtask_counts: Counter) -> int:
+    """随机执行一次任务操作，返回下一个可用的顶级任务ID
+
+    子任务编号按主任务递增，不复用已删除子任务的ID（删除任务不会清理其他任务对它的依赖声明）。
+    """
+    tasks = _all_tasks(storage)
+    task_ids = list(tasks)
+    main_ids = list(storage.tasks)
+    op = rng.random()
+
+    if op < 0.25 or not main_ids:
+        storage.create_task(
+            name=f"任务{next_top_id}",
+            id=str(next_top_id),
+            priority=rng.choice(list(TaskPriority)),
+            tags=rng.sample(TAGS, rng.randint(0, 2)),
+            assigned_to=rng.choice(ASSIGNEES),
+            dependencies=rng.sample(task_ids, min(len(task_ids), rng.randint(0, 2))),
+        )
+        return next_top_id + 1
+
+    if op < 0.4:
+        parent = storage.tasks[rng.choice(main_ids)]
+        subtask_counts[parent.id] += 1
+        subtask_id = f"{parent.id}.{subtask_counts[parent.id]}"
+        storage.create_task(
+            name=f"子任务{subtask_id}",
+            id=subtask_id,
+            priority=rng.choice(list(TaskPriority)),
+            tags=rng.sample(TAGS, rng.randint(0, 2)),
+            dependencies=rng.sample(task_ids, min(len(task_ids), rng.randint(0, 1))),
+        )
+    elif op < 0.55:
+        if len(task_ids) >= 2:
+            storage.set_task_dependency(*rng.sample(task_ids, 2))
+    elif op < 0.62:
+        task = tasks[rng.choice(task_ids)]
+        if task.dependencies:
+            storage.remove_task_dependency(task.id, rng.choice(sorted(task.dependencies)))
+    elif op < 0.7:
+        storage.mark_task_done(rng.choice(task_ids))
+    elif op < 0.9:
+        field = rng.choice(['status', 'priority', 'tags', 'assigned_to'])
+        value = {
+            'status': lambda: rng.choice([TaskStatus.TODO, TaskStatus.IN_PROGRESS, TaskStatus.BLOCKED, TaskStatus.CANCELLED]),
+            'priority': lambda: rng.choice(list(TaskPriority)),
+            'tags': lambda: rng.sample(TAGS, rng.randint(0, 3)),
+            'assigned_to': lambda: rng.choice(ASSIGNEES),
+        }[field]()
+        storage.update_task(rng.choice(task_ids), **{field: value})
+    else:
+        storage.delete_task(rng.choice(task_ids))
+
+    return next_top_id
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_indexes_match_brute_force_after_random_operations(tmp_path, seed):
+    rng = random.Random(seed)
+    storage = TaskStorage(tasks_dir=str(tmp_path))
+    next_top_id = 1
+    subtask_counts = Counter()
+
+    for _ in range(300):
+        next_top_id = _random_step(storage, rng, next_top_id, subtask_counts)
+        _check_indexes(storage, rng, next_top_id)
+
+    # 重新加载后由文件重建的索引同样与暴力计算一致
+    storage.flush()
+    reloaded = TaskStorage(tasks_dir=str(tmp_path))
+    assert sorted(_all_tasks(reloaded)) == sorted(_all_tasks(storage))
+    _check_indexes(reloaded, rng, next_top_id)
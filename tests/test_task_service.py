@@ -0,0 +1,34 @@
+"""
+任务服务测试
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+from src.models.task import TaskStatus
+from src.services.task_service import TaskService
+from src.storage.task_storage import TaskStorage
+
+
+class FakeLLM:
+    """按固定内容生成子任务的假 LLM 客户端"""
+    
+    async def generate_subtasks_for_task_async(self, parent_task, num_subtasks=5, **kwargs):
+        return [{"name": f"step {i}"} for i in range(num_subtasks)]
+
+
+def test_expand_task_after_subtask_status_change(tmp_path):
+    service = TaskService(storage=TaskStorage(tasks_dir=str(tmp_path)), llm_client=FakeLLM())
+    service.storage.create_task(name="parent", id="1")
+    service.storage.create_task(name="child", id="1.1")
+    assert service.update_task("1.1", status="in_progress")["success"]
+    
+    result = asyncio.run(service.expand_task("1", num_subtasks=2))
+    
+    assert result["success"]
+    parent = service.storage.get_task("1")
+    assert [sub.id for sub in parent.subtasks] == ["1.1", "1.2", "1.3"]
+    assert service.storage.get_task("1.1").status == TaskStatus.IN_PROGRESS
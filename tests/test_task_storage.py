@@ -0,0 +1,268 @@
+"""
+任务存储层测试
+"""
+
+import asyncio
+import gc
+import json
+import random
+import threading
+import weakref
+
+import pytest
+
+from src.models.task import TaskPriority, TaskStatus
+from src.storage import task_storage as task_storage_module
+from src.storage.task_storage import TaskStorage
+
+
+def _normalize(task_dict: dict) -> dict:
+    """集合字段排序后再比较"""
+    return {
+        **task_dict,
+        'dependencies': sorted(task_dict['dependencies']),
+        'blocked_by': sorted(task_dict['blocked_by']),
+        'subtasks': [_normalize(sub) for sub in task_dict['subtasks']],
+    }
+
+
+def _snapshot(storage: TaskStorage) -> dict:
+    """按任务ID导出内存中所有主任务的字典"""
+    return {task_id: _normalize(storage._task_to_dict(task)) for task_id, task in storage.tasks.items()}
+
+
+def _saved_snapshot(storage: TaskStorage) -> dict:
+    """按任务ID导出主任务文件中保存的任务字典"""
+    with open(storage.master_file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {task_dict['id']: _normalize(task_dict) for task_dict in data}
+
+
+def test_mutation_without_event_loop_is_written_immediately(tmp_path):
+    storage = TaskStorage(tasks_dir=str(tmp_path))
+    storage.create_task(name="a", id="1")
+    
+    assert not storage._dirty
+    assert _saved_snapshot(storage) == _snapshot(storage)
+
+
+def test_write_behind_flush_during_concurrent_mutations(tmp_path, monkeypatch):
+    storage = TaskStorage(tasks_dir=str(tmp_path), fsync_interval=0.001, fsync_threshold=10_000)
+    
+    # 记录每次保存所在的线程：保存必须与修改任务的代码在同一线程（事件循环线程）中执行
+    save_threads = []
+    original_save = storage._save_tasks_to_file
+    def recording_save(*args, **kwargs):
+        save_threads.append(threading.get_ident())
+        return original_save(*args, **kwargs)
+    monkeypatch.setattr(storage, "_save_tasks_to_file", recording_save)
+    
+    async def worker(n: int) -> None:
+        rng = random.Random(n)
+        for i in range(40):
+            task = storage.create_task(name=f"w{n}-{i}", id=str(n * 100 + i + 1))
+            storage.create_task(name=f"w{n}-{i}-sub", id=f"{task.id}.1")
+            if i:
+                storage.set_task_dependency(task.id, str(n * 100 + i))
+            if rng.random() < 0.5:
+                storage.update_task(task.id, priority=rng.choice(list(TaskPriority)).value)
+            if rng.random() < 0.3:
+                storage.mark_task_done(f"{task.id}.1")
+            if rng.random() < 0.1:
+                storage.delete_task(task.id)
+            # 让出事件循环，使其他协程的修改和延迟写入交错执行
+            await asyncio.sleep(rng.random() * 0.002)
+    
+    async def main() -> None:
+        await asyncio.gather(*(worker(n) for n in range(8)))
+        await asyncio.sleep(0.05)
+    
+    asyncio.run(main())
+    
+    # 最后一批变更由事件循环中的延迟写入保存，无需显式 flush
+    assert not storage._dirty
+    assert save_threads and set(save_threads) == {threading.get_ident()}
+    assert _saved_snapshot(storage) == _snapshot(storage)
+
+
+def test_exit_flush_covers_live_storages_without_keeping_them_alive(tmp_path):
+    storage = TaskStorage(tasks_dir=str(tmp_path), fsync_interval=60)
+    
+    async def mutate() -> None:
+        storage.create_task(name="a", id="1")
+    
+    # 事件循环结束时延迟写入尚未执行，变更只能由退出时的统一保存写入文件
+    asyncio.run(mutate())
+    assert storage._dirty
+    task_storage_module._flush_live_storages()
+    assert not storage._dirty
+    assert _saved_snapshot(storage) == _snapshot(storage)
+    
+    # 退出保存只持有弱引用，不再使用的实例可以被回收
+    ref = weakref.ref(storage)
+    del storage
+    gc.collect()
+    assert ref() is None
+
+
+def test_saved_file_tracks_every_mutation(tmp_path):
+    storage = TaskStorage(tasks_dir=str(tmp_path))
+    for i in range(1, 6):
+        storage.create_task(name=f"t{i}", id=str(i))
+        storage.create_task(name=f"t{i}.1", id=f"{i}.1")
+    
+    # 每次变更后保存的字典缓存都必须失效，文件内容与内存保持一致
+    mutations = [
+        lambda: storage.update_task("1", priority=TaskPriority.HIGH.value),
+        lambda: storage.update_task("1.1", status=TaskStatus.IN_PROGRESS.value),
+        lambda: storage.set_task_dependency("2", "1"),
+        lambda: storage.set_task_dependency("3.1", "2.1"),
+        lambda: storage.mark_task_done("1"),
+        lambda: storage.mark_task_done("2.1"),
+        lambda: storage.remove_task_dependency("2", "1"),
+        lambda: storage.delete_task("4.1"),
+        lambda: storage.delete_task("5"),
+    ]
+    for mutate in mutations:
+        mutate()
+        storage.flush()
+        assert _saved_snapshot(storage) == _snapshot(storage)
+
+
+def _graph(storage: TaskStorage) -> dict:
+    return {task_id: dependents for task_id, dependents in storage.dependency_graph.items() if dependents}
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_dependency_graph_rebuilt_on_load(tmp_path, monkeypatch, streaming):
+    storage = TaskStorage(tasks_dir=str(tmp_path))
+    for i in range(1, 5):
+        storage.create_task(name=f"t{i}", id=str(i))
+        storage.create_task(name=f"t{i}.1", id=f"{i}.1")
+    storage.set_task_dependency("2", "1")
+    storage.set_task_dependency("3", "2")
+    storage.set_task_dependency("4.1", "3.1")
+    storage.set_task_dependency("4", "1.1")
+    storage.flush()
+    
+    if not streaming:
+        monkeypatch.setattr(task_storage_module, "ijson", None)
+    loaded = TaskStorage(tasks_dir=str(tmp_path))
+    
+    assert _graph(loaded) == _graph(storage)
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_truncated_file_loads_nothing(tmp_path, monkeypatch, streaming):
+    storage = TaskStorage(tasks_dir=str(tmp_path))
+    for i in range(1, 10):
+        storage.create_task(name=f"t{i}", id=str(i))
+    storage.flush()
+    with open(storage.master_file_path, 'rb') as f:
+        content = f.read()
+    with open(storage.master_file_path, 'wb') as f:
+        f.write(content[:len(content) * 2 // 3])
+    
+    if not streaming:
+        monkeypatch.setattr(task_storage_module, "ijson", None)
+    loaded = TaskStorage(tasks_dir=str(tmp_path))
+    
+    # 解析失败时不加载任何任务，而不是留下一部分任务且索引为空
+    assert loaded.tasks == {}
+    assert loaded.list_tasks() == ([], 0)
+    assert loaded.get_next_executable_tasks() == []
+
+
+def test_bulk_add_dependencies_applies_whole_batch(tmp_path):
+    storage = TaskStorage(tasks_dir=str(tmp_path))
+    for i in range(1, 5):
+        storage.create_task(name=f"t{i}", id=str(i))
+    storage.create_task(name="t1.1", id="1.1")
+    storage.mark_task_done("1")
+    
+    assert storage.bulk_add_dependencies([("2", "1"), ("3", "2"), ("4", "3"), ("4", "1.1")]) == (True, None)
+    
+    assert storage.get_task("4").dependencies == {"3", "1.1"}
+    assert storage.get_task("2").blocked_by == set()  # 已完成的任务不阻塞
+    assert storage.get_task("3").blocked_by == {"2"}
+    assert _graph(storage) == {"1": {"2"}, "2": {"3"}, "3": {"4"}, "1.1": {"4"}}
+
+
+@pytest.mark.parametrize("edges", [
+    # 循环完全由新增依赖组成
+    [("2", "1"), ("3", "2"), ("1", "3")],
+    # 新增依赖与已有依赖一起形成循环
+    [("4", "3"), ("1", "4")],
+    # 批次中包含不存在的任务
+    [("4", "3"), ("4", "missing")],
+])
+def test_bulk_add_dependencies_rolls_back_invalid_batch(tmp_path, edges):
+    storage = TaskStorage(tasks_dir=str(tmp_path))
+    for i in range(1, 5):
+        storage.create_task(name=f"t{i}", id=str(i))
+    storage.set_task_dependency("3", "2")
+    storage.set_task_dependency("2", "1")
+    before = _snapshot(storage)
+    graph_before = _graph(storage)
+    
+    success, error = storage.bulk_add_dependencies(edges)
+    
+    assert not success and error
+    assert _snapshot(storage) == before
+    assert _graph(storage) == graph_before
+
+
+def test_msgpack_format_migrates_existing_json_store(tmp_path, monkeypatch):
+    pytest.importorskip("msgpack")
+    storage = TaskStorage(tasks_dir=str(tmp_path))
+    storage.create_task(name="a", id="1")
+    storage.create_task(name="a.1", id="1.1")
+    storage.set_task_dependency("1.1", "1")
+    storage.flush()
+    
+    monkeypatch.setenv("TASK_STORAGE_MSGPACK", "1")
+    migrated = TaskStorage(tasks_dir=str(tmp_path))
+    
+    assert migrated.master_file_path.endswith("all_tasks.msgpack")
+    assert _snapshot(migrated) == _snapshot(storage)
+    assert _graph(migrated) == _graph(storage)
+
+
+def test_bulk_create_skips_failed_specs_and_writes_once(tmp_path, monkeypatch):
+    storage = TaskStorage(tasks_dir=str(tmp_path))
+    storage.create_task(name="existing", id="1")
+    saves = []
+    original_save = storage._save_tasks_to_file
+    def counting_save(*args, **kwargs):
+        saves.append(1)
+        return original_save(*args, **kwargs)
+    monkeypatch.setattr(storage, "_save_tasks_to_file", counting_save)
+    
+    created = storage.bulk_create([
+        {"id": "2", "name": "b"},
+        {"id": "1", "name": "duplicate"},
+        {"id": "2.1", "name": "b.1", "dependencies": ["2"]},
+    ])
+    
+    assert [task.id if task else None for task in created] == ["2", None, "2.1"]
+    assert storage.get_task("1").name == "existing"
+    assert storage.get_task("2.1").blocked_by == {"2"}
+    assert len(saves) == 1
+    assert set(_saved_snapshot(storage)) == {"1", "2"}
+
+
+def test_update_subtasks_accepts_enum_fields_in_dicts(tmp_path):
+    storage = TaskStorage(tasks_dir=str(tmp_path))
+    parent = storage.create_task(name="parent", id="1")
+    storage.create_task(name="child", id="1.1")
+    # TaskService 更新子任务时直接把枚举成员赋给字段，再经 _task_to_dict 往返
+    parent.subtasks[0].status = TaskStatus.IN_PROGRESS
+    parent.subtasks[0].priority = TaskPriority.HIGH
+    subtasks_data = [storage._task_to_dict(sub) for sub in parent.subtasks]
+    subtasks_data.append({"id": "1.2", "name": "new child"})
+    
+    storage.update_task("1", subtasks=subtasks_data)
+    
+    assert [sub.id for sub in parent.subtasks] == ["1.1", "1.2"]
+    assert storage.get_task("1.1").status == TaskStatus.IN_PROGRESS
+    assert storage.get_task("1.1").priority == TaskPriority.HIGH